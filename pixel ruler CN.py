@@ -1,16 +1,37 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import math
+import os
+import sys
+import ctypes
+import json
+import hashlib
+import stat
+import errno
+import socket
+import queue
+import asyncio
+import concurrent.futures
+import argparse
+import numpy as np
 import pyautogui
-from PIL import Image, ImageGrab
+from PIL import Image, ImageGrab, ImageTk, ImageDraw, ImageColor
 import threading
 import time
 
+try:
+    import mss  # 可选依赖，只截取所需的屏幕区域
+except ImportError:
+    mss = None
+
+# 按文档来源缓存的校准比例
+SCALE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".pixel_ruler_scales.json")
+
 class PersistentVisualRuler:
     def __init__(self, root):
         self.root = root
         self.root.title("可视化拖拽测量尺")
-        self.root.geometry("450x650")
+        self.root.geometry("450x880")
         self.root.resizable(False, False)
         
         # 测量状态
@@ -26,19 +47,50 @@ class PersistentVisualRuler:
         self.overlay_window = None
         self.overlay_label = None
         
-        # 全屏透明窗口用于捕获事件
-        self.capture_window = None
-        self.canvas = None
+        # 每个显示器一个全屏透明窗口用于捕获事件
+        self.monitors = get_monitors(self.root)
+        self.capture_windows = []
+        self.canvas = None  # 当前拖动所在显示器的画布
+        self.monitor = None
+        self.selecting_region = False
+        self.region = None  # 截图的感兴趣区域
+        
+        # 混合DPI环境下各显示器单独的比例
+        self.monitor_scales = {}
         
         # 线条颜色和样式
         self.line_color = "red"
         self.line_width = 2
         
+        # 网格和标尺叠加层，按输入参数渲染一次并缓存
+        self.grid_spacing = 1.0  # 单位长度
+        self.grid_color = "white"
+        self.overlay_cache = {}
+        
         # 存储所有测量线段
         self.measurement_lines = []  # 存储 (line_id, start_point, end_point, distance, real_distance)
         
+        # 与自动化接口共享的测量会话
+        self.results = []
+        self.results_lock = threading.Lock()
+        self.results_shown = False  # 文本框中是否已有结果
+        self.rpc_server = None
+        
+        # 滚动截图状态
+        self.scroll_capture = None
+        self.scroll_window = None
+        
+        # 校准，比例按来源 (key, label) 缓存
+        self.calibrating = False
+        self.source = None
+        self.last_window_title = None
+        self.scale_cache = self.load_scale_cache()
+        
         self.setup_ui()
         
+        # 跟踪前台文档窗口
+        self.root.after(500, self.poll_active_window)
+        
     def setup_ui(self):
         # 主框架
         main_frame = ttk.Frame(self.root, padding="15")
@@ -58,13 +110,34 @@ class PersistentVisualRuler:
                               font=("微软雅黑", 8), foreground="gray")
         scale_help.grid(row=0, column=0, columnspan=3, sticky=tk.W, pady=(0,5))
         
-        ttk.Label(scale_frame, text="比例 (像素/单位):").grid(row=1, column=0, padx=5)
+        ttk.Label(scale_frame, text="显示器:").grid(row=1, column=0, padx=5, pady=(0,5))
+        self.monitor_var = tk.StringVar(value="所有显示器")
+        monitor_combo = ttk.Combobox(scale_frame, textvariable=self.monitor_var, 
+                                    values=["所有显示器"] + [m['name'] for m in self.monitors],
+                                    width=15, state="readonly")
+        monitor_combo.grid(row=1, column=1, padx=5, pady=(0,5))
+        monitor_combo.bind('<<ComboboxSelected>>', lambda e: self.update_scale_entry())
+        
+        ttk.Label(scale_frame, text="比例 (像素/单位):").grid(row=2, column=0, padx=5)
         self.scale_entry = ttk.Entry(scale_frame, width=15)
         self.scale_entry.insert(0, "100")
-        self.scale_entry.grid(row=1, column=1, padx=5)
+        self.scale_entry.grid(row=2, column=1, padx=5)
         
         ttk.Button(scale_frame, text="设置", 
-                  command=self.set_scale).grid(row=1, column=2, padx=10)
+                  command=self.set_scale).grid(row=2, column=2, padx=10)
+        
+        ttk.Label(scale_frame, text="来源:").grid(row=3, column=0, padx=5, pady=(5,0))
+        self.source_label = ttk.Label(scale_frame, text="未知", foreground="gray")
+        self.source_label.grid(row=3, column=1, columnspan=2, sticky=tk.W, padx=5, pady=(5,0))
+        
+        calibrate_frame = ttk.Frame(scale_frame)
+        calibrate_frame.grid(row=4, column=0, columnspan=3, pady=(5,0))
+        
+        ttk.Button(calibrate_frame, text="校准",
+                  command=self.start_calibration).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(calibrate_frame, text="识别比例尺",
+                  command=self.detect_screen_scale_bar).pack(side=tk.LEFT, padx=5)
         
         # 线条样式设置
         style_frame = ttk.LabelFrame(main_frame, text="线条样式", padding="5")
@@ -86,6 +159,32 @@ class PersistentVisualRuler:
         width_combo.grid(row=0, column=3, padx=5)
         width_combo.bind('<<ComboboxSelected>>', self.change_line_width)
         
+        # 网格和标尺设置
+        grid_frame = ttk.LabelFrame(main_frame, text="网格与标尺", padding="5")
+        grid_frame.pack(fill=tk.X, pady=5)
+        
+        self.rulers_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(grid_frame, text="标尺", variable=self.rulers_var,
+                       command=self.refresh_overlays).grid(row=0, column=0, padx=5)
+        
+        self.grid_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(grid_frame, text="网格", variable=self.grid_var,
+                       command=self.refresh_overlays).grid(row=0, column=1, padx=5)
+        
+        ttk.Label(grid_frame, text="间距 (单位):").grid(row=0, column=2, padx=5)
+        self.spacing_entry = ttk.Entry(grid_frame, width=6)
+        self.spacing_entry.insert(0, "1")
+        self.spacing_entry.grid(row=0, column=3, padx=5)
+        self.spacing_entry.bind('<Return>', self.change_grid)
+        self.spacing_entry.bind('<FocusOut>', self.change_grid)
+        
+        self.grid_color_var = tk.StringVar(value="white")
+        grid_color_combo = ttk.Combobox(grid_frame, textvariable=self.grid_color_var, 
+                                       values=["red", "blue", "green", "yellow", "white", "black"],
+                                       width=8, state="readonly")
+        grid_color_combo.grid(row=0, column=4, padx=5)
+        grid_color_combo.bind('<<ComboboxSelected>>', self.change_grid)
+        
         # 按钮区域
         btn_frame = ttk.Frame(main_frame)
         btn_frame.pack(pady=15)
@@ -104,6 +203,22 @@ class PersistentVisualRuler:
         ttk.Button(btn_frame, text="退出", 
                   command=self.root.quit).pack(side=tk.LEFT, padx=10)
         
+        # 图片工具
+        tool_frame = ttk.Frame(main_frame)
+        tool_frame.pack()
+        
+        ttk.Button(tool_frame, text="打开图片",
+                  command=self.open_image).pack(side=tk.LEFT, padx=10)
+        
+        ttk.Button(tool_frame, text="滚动截图",
+                  command=self.start_scroll_capture).pack(side=tk.LEFT, padx=10)
+        
+        ttk.Button(tool_frame, text="选择区域",
+                  command=self.start_region_selection).pack(side=tk.LEFT, padx=10)
+        
+        ttk.Button(tool_frame, text="清除区域",
+                  command=self.clear_region).pack(side=tk.LEFT, padx=10)
+        
         # 状态显示
         self.status_label = ttk.Label(main_frame, text="状态: 就绪", 
                                      foreground="green", font=("微软雅黑", 10))
@@ -130,7 +245,11 @@ class PersistentVisualRuler:
 3. 在屏幕上按住鼠标左键拖动进行测量
 4. 拖拽时会显示测量线，松开左键完成测量
 5. 所有测量线段会保持显示直到按下ESC键
-6. 按ESC键结束测量模式并清除所有线段"""
+6. 按ESC键结束测量模式并清除所有线段
+7. 图纸超出屏幕高度时，使用"滚动截图"并在拼接后的图片上测量
+8. "校准"根据已知长度的参照设置比例，并按文档记住
+9. 多显示器时，在"显示器"中选择一个可为其单独设置比例
+10. "标尺"和"网格"会在测量时按比例绘制标尺和网格"""
         
         help_label = ttk.Label(main_frame, text=help_text, 
                               justify=tk.LEFT, font=("微软雅黑", 9))
@@ -141,18 +260,235 @@ class PersistentVisualRuler:
         
     def set_scale(self):
         try:
-            self.scale_factor = float(self.scale_entry.get())
-            if self.scale_factor <= 0:
+            scale_factor = float(self.scale_entry.get())
+            if not (math.isfinite(scale_factor) and scale_factor > 0):
                 raise ValueError
-            messagebox.showinfo("成功", f"比例尺已设置为: {self.scale_factor} 像素/单位")
+            self.use_scale(scale_factor, self.source, self.selected_monitor())
+            messagebox.showinfo("成功", f"比例尺已设置为: {scale_factor} 像素/单位")
         except ValueError:
             messagebox.showerror("错误", "请输入有效的正数")
             
+    def update_scale_entry(self):
+        """在比例输入框中显示所选显示器的比例"""
+        self.scale_entry.delete(0, tk.END)
+        self.scale_entry.insert(0, f"{self.scale_for(self.selected_monitor()):g}")
+        
+    def selected_monitor(self):
+        for monitor in self.monitors:
+            if monitor['name'] == self.monitor_var.get():
+                return monitor
+        return None
+    
+    def scale_for(self, monitor):
+        """显示器的比例，未单独设置时为全局比例"""
+        if monitor is None:
+            return self.scale_factor
+        return self.monitor_scales.get(monitor['name'], self.scale_factor)
+    
+    def scale_at(self, x, y):
+        """屏幕位置处的比例"""
+        if not self.monitor_scales:
+            return self.scale_factor
+        return self.scale_for(self.monitor_at(x, y))
+    
+    def monitor_at(self, x, y):
+        """包含该屏幕位置的显示器，都不包含时返回第一个"""
+        for monitor in self.monitors:
+            if (monitor['x'] <= x < monitor['x'] + monitor['width'] and
+                    monitor['y'] <= y < monitor['y'] + monitor['height']):
+                return monitor
+        return self.monitors[0]
+    
+    def capture_bbox(self):
+        """截图的屏幕范围：优先选定区域，其次所选显示器或鼠标所在显示器"""
+        if self.region:
+            return self.region
+        monitor = self.selected_monitor() or self.monitor_at(*self.root.winfo_pointerxy())
+        return monitor_bbox(monitor)
+        
+    def load_scale_cache(self):
+        try:
+            with open(SCALE_CACHE_PATH, encoding='utf-8') as f:
+                cache = json.load(f)
+            # 丢弃旧版本写入的无效比例
+            return {key: entry for key, entry in cache.items()
+                    if math.isfinite(entry['scale']) and entry['scale'] > 0}
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return {}
+        
+    def remember_scale(self, source, monitor=None):
+        """为来源缓存当前比例，无需再次输入"""
+        if not source:
+            return
+        key = source[0] if monitor is None else f"{source[0]}@{monitor['name']}"
+        self.scale_cache[key] = {'scale': self.scale_for(monitor), 'label': source[1]}
+        try:
+            with open(SCALE_CACHE_PATH, 'w', encoding='utf-8') as f:
+                json.dump(self.scale_cache, f, indent=1)
+        except OSError as e:
+            messagebox.showerror("错误", f"无法保存比例缓存: {e}")
+            
+    def set_source(self, source):
+        """切换文档来源并加载其缓存的比例"""
+        if source == self.source:
+            return
+        self.source = source
+        self.source_label.config(text=source[1] if source else "未知")
+        if not source:
+            return
+        
+        # 来源本身的比例以及为其缓存的各显示器比例，
+        # 上一个来源的显示器比例不会保留
+        changed = bool(self.monitor_scales)
+        self.monitor_scales = {}
+        loaded = False
+        cached = self.scale_cache.get(source[0])
+        if cached:
+            self.scale_factor = cached['scale']
+            loaded = True
+        for monitor in self.monitors:
+            cached = self.scale_cache.get(f"{source[0]}@{monitor['name']}")
+            if cached:
+                self.monitor_scales[monitor['name']] = cached['scale']
+                loaded = True
+        if loaded or changed:
+            self.update_scale_entry()
+            self.refresh_overlays()
+        if loaded:
+            self.status_label.config(text=f"状态: 已为 {source[1]} 加载比例",
+                                     foreground="green")
+            
+    def poll_active_window(self):
+        """将其他程序的前台窗口作为当前来源"""
+        try:
+            title = pyautogui.getActiveWindowTitle()
+        except (AttributeError, NotImplementedError, pyautogui.PyAutoGUIException):
+            return  # 此平台无法获取窗口标题
+        
+        # 跳过本程序的窗口(包括系统对话框)，在其上测量时保持之前的来源；
+        # 无法获取进程id时按窗口标题判断
+        owner = foreground_window_pid()
+        if owner is not None:
+            own = owner == os.getpid()
+        else:
+            own_titles = {self.root.title()}
+            own_titles.update(w.title() for w in self.root.winfo_children() if isinstance(w, tk.Toplevel))
+            own = title in own_titles
+        if title and not own and title != self.last_window_title:
+            self.last_window_title = title
+            self.set_source(("window:" + title, title))
+        self.root.after(500, self.poll_active_window)
+        
+    def use_scale(self, scale_factor, source, monitor=None):
+        """设置某个显示器或全局的比例，并为该来源缓存"""
+        if monitor:
+            self.monitor_scales[monitor['name']] = scale_factor
+        else:
+            self.scale_factor = scale_factor
+        self.update_scale_entry()
+        self.remember_scale(source, monitor)
+        self.refresh_overlays()
+        
+    def apply_scale(self, scale_factor, source, monitor=None):
+        """使用校准后的比例并为来源缓存"""
+        # 显示被校准显示器的比例，而不是未改变的全局比例
+        if monitor:
+            self.monitor_var.set(monitor['name'])
+        self.use_scale(scale_factor, source, monitor)
+        self.status_label.config(text=f"状态: 比例已校准为 {scale_factor:.2f} 像素/单位",
+                                 foreground="green")
+        
+    def calibrate_from_distance(self, distance, source, parent, monitor=None):
+        """询问参照的实际长度并据此计算比例"""
+        if distance <= 0:
+            return
+        length = simpledialog.askfloat("校准",
+                                       f"参照长度: {distance:.1f} 像素\n请输入其实际长度:",
+                                       parent=parent)
+        if length is None:
+            return  # 已取消
+        scale_factor = distance / length if length > 0 else 0.0
+        if not (math.isfinite(scale_factor) and scale_factor > 0):
+            messagebox.showerror("错误", "请输入有效的正数", parent=parent)
+            return
+        self.apply_scale(scale_factor, source, monitor)
+            
+    def start_calibration(self):
+        """在屏幕上测量已知长度的参照来设置比例"""
+        if not self.is_measuring:
+            self.start_measurement()
+        self.calibrating = True
+        x, y = self.root.winfo_pointerxy()
+        self.update_overlay("请拖过一段已知长度的参照", x, y)
+        
+    def detect_screen_scale_bar(self):
+        """主窗口最小化后在屏幕上查找比例尺"""
+        bbox = self.capture_bbox()
+        self.root.iconify()
+        self.root.after(300, self._detect_screen_scale_bar, bbox)
+        
+    def _detect_screen_scale_bar(self, bbox):
+        try:
+            frame = grab_region(bbox)
+        except OSError as e:
+            self.root.deiconify()
+            messagebox.showerror("错误", f"截屏失败: {e}")
+            return
+        self.root.deiconify()
+        bar = detect_scale_bar(frame)
+        if bar is None:
+            messagebox.showinfo("识别比例尺", "未找到比例尺")
+            return
+        x, y = bar[0] + bbox[0], bar[1] + bbox[1]
+        self.status_label.config(text=f"状态: 在 ({x}, {y}) 找到比例尺", foreground="green")
+        monitor = self.monitor_at(x, y) if len(self.monitors) > 1 else None
+        self.calibrate_from_distance(bar[2], self.source, self.root, monitor)
+            
     def change_line_color(self, event=None):
         self.line_color = self.color_var.get()
         
     def change_line_width(self, event=None):
         self.line_width = int(self.width_var.get())
+        
+    def change_grid(self, event=None):
+        try:
+            spacing = float(self.spacing_entry.get())
+            if not (math.isfinite(spacing) and spacing > 0):
+                raise ValueError
+        except ValueError:
+            self.spacing_entry.delete(0, tk.END)
+            self.spacing_entry.insert(0, f"{self.grid_spacing:g}")
+            return
+        self.grid_spacing = spacing
+        self.grid_color = self.grid_color_var.get()
+        self.refresh_overlays()
+        
+    def overlay_image(self, monitor):
+        """显示器的网格/标尺叠加层，仅在输入参数变化时重新渲染"""
+        key = (self.scale_for(monitor), self.grid_spacing, self.grid_color, 
+               monitor['width'], monitor['height'], self.rulers_var.get(), self.grid_var.get())
+        photo = self.overlay_cache.get(key)
+        if photo is None:
+            # 每张图片都是整个显示器大小的RGBA，只保留少量
+            if len(self.overlay_cache) >= 4:
+                self.overlay_cache.clear()
+            photo = ImageTk.PhotoImage(render_overlay(monitor['width'], monitor['height'], *key[:3], *key[5:]))
+            self.overlay_cache[key] = photo
+        return photo
+    
+    def draw_overlay(self, canvas):
+        """以单个图片项在测量线下方显示叠加层"""
+        canvas.delete('overlay')
+        if not (self.rulers_var.get() or self.grid_var.get()):
+            return
+        # 即使缓存被清空，也保留正在显示的图片
+        canvas.overlay_photo = self.overlay_image(canvas.monitor)
+        canvas.create_image(0, 0, image=canvas.overlay_photo, anchor=tk.NW, tags='overlay')
+        canvas.tag_lower('overlay')
+        
+    def refresh_overlays(self):
+        for capture_window in self.capture_windows:
+            self.draw_overlay(capture_window.canvas)
             
     def toggle_measurement(self):
         if not self.is_measuring:
@@ -170,7 +506,7 @@ class PersistentVisualRuler:
         self.status_label.config(text="状态: 测量中... 按住左键拖动测量", foreground="red")
         
         # 创建全屏透明窗口来捕获鼠标事件
-        self.create_capture_window()
+        self.create_capture_windows()
         
         # 创建实时显示窗口
         self.create_overlay_window()
@@ -178,28 +514,53 @@ class PersistentVisualRuler:
         # 最小化主窗口
         self.root.iconify()
         
-    def create_capture_window(self):
-        """创建全屏透明窗口来捕获鼠标事件"""
-        self.capture_window = tk.Toplevel(self.root)
-        self.capture_window.attributes('-fullscreen', True)
-        self.capture_window.attributes('-alpha', 0.3)  # 几乎透明
-        self.capture_window.attributes('-topmost', True)
-        self.capture_window.configure(cursor="crosshair", bg='black')
-        
-        # 创建画布用于绘制测量线
-        self.canvas = tk.Canvas(self.capture_window, highlightthickness=0)
-        self.canvas.pack(fill=tk.BOTH, expand=True)
-        self.canvas.configure(bg='black')
-        
-        # 绑定事件
-        self.canvas.bind('<Button-1>', self.on_mouse_down)
-        self.canvas.bind('<B1-Motion>', self.on_mouse_drag)
-        self.canvas.bind('<ButtonRelease-1>', self.on_mouse_up)
-        self.capture_window.bind('<Escape>', self.stop_measurement)
+    def create_capture_windows(self):
+        """为每个显示器创建全屏透明窗口来捕获鼠标事件"""
+        if self.selecting_region:
+            handlers = (self.on_region_down, self.on_region_drag, self.on_region_up)
+        else:
+            handlers = (self.on_mouse_down, self.on_mouse_drag, self.on_mouse_up)
+        
+        for monitor in self.monitors:
+            # 全屏作用于窗口所在的显示器
+            capture_window = tk.Toplevel(self.root)
+            capture_window.geometry(f"+{monitor['x']}+{monitor['y']}")
+            capture_window.attributes('-fullscreen', True)
+            capture_window.attributes('-alpha', 0.3)  # 几乎透明
+            capture_window.attributes('-topmost', True)
+            capture_window.configure(cursor="crosshair", bg='black')
+            
+            # 创建画布用于绘制测量线
+            canvas = tk.Canvas(capture_window, highlightthickness=0)
+            canvas.pack(fill=tk.BOTH, expand=True)
+            canvas.configure(bg='black')
+            canvas.monitor = monitor
+            capture_window.canvas = canvas
+            
+            # 绑定事件
+            canvas.bind('<Button-1>', handlers[0])
+            canvas.bind('<B1-Motion>', handlers[1])
+            canvas.bind('<ButtonRelease-1>', handlers[2])
+            capture_window.bind('<Escape>', self.stop_measurement)
+            self.capture_windows.append(capture_window)
+            self.draw_overlay(canvas)
+        
+        if self.capture_windows:
+            self.capture_windows[0].focus_force()
         
         # 初始化临时线条ID
         self.temp_line_id = None
         
+    def to_canvas(self, point):
+        """将屏幕位置转换为当前显示器画布上的坐标"""
+        return (point[0] - self.monitor['x'], point[1] - self.monitor['y'])
+    
+    def clamp_to_monitor(self, event):
+        """将事件位置限制在当前显示器内，拖动不跨越显示器"""
+        monitor = self.monitor
+        return (min(max(event.x_root, monitor['x']), monitor['x'] + monitor['width'] - 1),
+                min(max(event.y_root, monitor['y']), monitor['y'] + monitor['height'] - 1))
+        
     def create_overlay_window(self):
         """创建实时显示的小窗口"""
         self.overlay_window = tk.Toplevel(self.root)
@@ -222,6 +583,8 @@ class PersistentVisualRuler:
     def on_mouse_down(self, event):
         """鼠标按下事件"""
         if self.is_measuring:
+            self.canvas = event.widget
+            self.monitor = self.canvas.monitor
             self.start_point = (event.x_root, event.y_root)
             self.dragging = True
             self.update_overlay("开始测量...", event.x_root, event.y_root)
@@ -229,7 +592,7 @@ class PersistentVisualRuler:
     def on_mouse_drag(self, event):
         """鼠标拖动事件"""
         if self.is_measuring and self.dragging and self.start_point:
-            current_point = (event.x_root, event.y_root)
+            current_point = self.clamp_to_monitor(event)
             
             # 清除之前的临时线条
             if self.temp_line_id:
@@ -237,8 +600,8 @@ class PersistentVisualRuler:
             
             # 绘制新临时线条
             self.temp_line_id = self.canvas.create_line(
-                self.start_point[0], self.start_point[1],
-                current_point[0], current_point[1],
+                *self.to_canvas(self.start_point),
+                *self.to_canvas(current_point),
                 fill=self.line_color, width=self.line_width
             )
             
@@ -247,7 +610,7 @@ class PersistentVisualRuler:
                 (current_point[0] - self.start_point[0])**2 + 
                 (current_point[1] - self.start_point[1])**2
             )
-            real_distance = distance / self.scale_factor
+            real_distance = distance / self.scale_for(self.monitor)
             
             # 更新实时显示
             display_text = f"像素: {distance:.1f}\n实际: {real_distance:.2f}"
@@ -256,14 +619,22 @@ class PersistentVisualRuler:
     def on_mouse_up(self, event):
         """鼠标释放事件"""
         if self.is_measuring and self.dragging and self.start_point:
-            end_point = (event.x_root, event.y_root)
+            end_point = self.clamp_to_monitor(event)
             
             # 计算最终距离
             distance = math.sqrt(
                 (end_point[0] - self.start_point[0])**2 + 
                 (end_point[1] - self.start_point[1])**2
             )
-            real_distance = distance / self.scale_factor
+            real_distance = distance / self.scale_for(self.monitor)
+            
+            # 校准拖动用于设置比例，不记录结果
+            if self.calibrating:
+                monitor = self.monitor if len(self.monitors) > 1 else None
+                self.stop_measurement()
+                self.start_point = None
+                self.calibrate_from_distance(distance, self.source, self.root, monitor)
+                return
             
             # 将临时线条转换为永久线条
             if self.temp_line_id:
@@ -272,13 +643,14 @@ class PersistentVisualRuler:
                 
                 # 创建永久线条
                 permanent_line_id = self.canvas.create_line(
-                    self.start_point[0], self.start_point[1],
-                    end_point[0], end_point[1],
+                    *self.to_canvas(self.start_point),
+                    *self.to_canvas(end_point),
                     fill=self.line_color, width=self.line_width
                 )
                 
                 # 存储线条信息
                 self.measurement_lines.append({
+                    'canvas': self.canvas,
                     'line_id': permanent_line_id,
                     'start_point': self.start_point,
                     'end_point': end_point,
@@ -297,6 +669,54 @@ class PersistentVisualRuler:
         self.dragging = False
         self.start_point = None
         
+    def start_region_selection(self):
+        """拖出矩形，将截图限制在感兴趣区域内"""
+        if self.is_measuring:
+            self.stop_measurement()
+        self.selecting_region = True
+        self.create_capture_windows()
+        self.create_overlay_window()
+        x, y = self.root.winfo_pointerxy()
+        self.update_overlay("拖动选择截图区域", x, y)
+        self.root.iconify()
+        
+    def on_region_down(self, event):
+        self.canvas = event.widget
+        self.monitor = self.canvas.monitor
+        self.start_point = (event.x_root, event.y_root)
+        
+    def on_region_drag(self, event):
+        if not self.start_point:
+            return
+        current_point = self.clamp_to_monitor(event)
+        if self.temp_line_id:
+            self.canvas.delete(self.temp_line_id)
+        self.temp_line_id = self.canvas.create_rectangle(
+            *self.to_canvas(self.start_point),
+            *self.to_canvas(current_point),
+            outline=self.line_color, width=self.line_width
+        )
+        width = abs(current_point[0] - self.start_point[0])
+        height = abs(current_point[1] - self.start_point[1])
+        self.update_overlay(f"{width} x {height}", event.x_root, event.y_root)
+        
+    def on_region_up(self, event):
+        if not self.start_point:
+            return
+        end_point = self.clamp_to_monitor(event)
+        left, right = sorted((self.start_point[0], end_point[0]))
+        top, bottom = sorted((self.start_point[1], end_point[1]))
+        self.stop_measurement()
+        self.start_point = None
+        if right - left >= 10 and bottom - top >= 10:
+            self.region = (left, top, right + 1, bottom + 1)
+            self.status_label.config(text=f"状态: 区域 {right - left + 1} x {bottom - top + 1}，位于 ({left}, {top})",
+                                     foreground="green")
+            
+    def clear_region(self):
+        self.region = None
+        self.status_label.config(text="状态: 截图覆盖整个显示器", foreground="green")
+        
     def update_overlay(self, text, x, y):
         """更新实时显示窗口的位置和内容"""
         if self.overlay_window and self.overlay_label:
@@ -306,6 +726,8 @@ class PersistentVisualRuler:
             
     def stop_measurement(self, event=None):
         self.is_measuring = False
+        self.calibrating = False
+        self.selecting_region = False
         self.dragging = False
         self.start_btn.config(text="开始拖拽测量")
         self.status_label.config(text="状态: 就绪", foreground="green")
@@ -314,9 +736,10 @@ class PersistentVisualRuler:
         self.clear_lines()
         
         # 关闭捕获窗口
-        if self.capture_window:
-            self.capture_window.destroy()
-            self.capture_window = None
+        for capture_window in self.capture_windows:
+            capture_window.destroy()
+        self.capture_windows = []
+        self.canvas = None
             
         # 关闭实时显示窗口
         if self.overlay_window:
@@ -328,6 +751,9 @@ class PersistentVisualRuler:
         self.root.lift()
         
     def clear_results(self):
+        with self.results_lock:
+            self.results = []
+        self.results_shown = False
         self.result_text.config(state=tk.NORMAL)
         self.result_text.delete(1.0, tk.END)
         self.result_text.insert(tk.END, "暂无测量结果\n")
@@ -335,42 +761,947 @@ class PersistentVisualRuler:
         
     def clear_lines(self):
         """清除所有测量线段"""
-        if self.canvas:
-            # 清除临时线条
-            if self.temp_line_id:
-                self.canvas.delete(self.temp_line_id)
-                self.temp_line_id = None
-                
-            # 清除所有永久线条
-            for line_info in self.measurement_lines:
-                self.canvas.delete(line_info['line_id'])
+        # 清除临时线条
+        if self.canvas and self.temp_line_id:
+            self.canvas.delete(self.temp_line_id)
+            self.temp_line_id = None
             
-            # 清空线条列表
-            self.measurement_lines = []
+        # 清除所有永久线条
+        for line_info in self.measurement_lines:
+            line_info['canvas'].delete(line_info['line_id'])
+        
+        # 清空线条列表
+        self.measurement_lines = []
         
     def record_result(self, pixel_distance, real_distance, start_point, end_point):
-        """记录测量结果到文本框"""
-        self.result_text.config(state=tk.NORMAL)
+        """记录测量结果到会话和文本框"""
+        results = self.store_results([(start_point, end_point, pixel_distance, real_distance)])
+        self.show_results(results)
         
-        # 添加分隔线（如果不是第一条记录）
-        if self.result_text.get(1.0, tk.END).strip() != "暂无测量结果":
-            self.result_text.insert(tk.END, "-" * 50 + "\n")
+    def store_results(self, measurements):
+        """将 (起点, 终点, 像素, 实际) 元组追加到会话，线程安全"""
+        with self.results_lock:
+            index = len(self.results)
+            results = []
+            for start_point, end_point, pixel_distance, real_distance in measurements:
+                results.append({
+                    'index': index,
+                    'start_point': list(start_point),
+                    'end_point': list(end_point),
+                    'pixel_distance': pixel_distance,
+                    'real_distance': real_distance
+                })
+                index += 1
+            self.results.extend(results)
+        
+        # 将新结果推送给接口订阅者
+        if self.rpc_server:
+            self.rpc_server.publish(results)
+        return results
+        
+    def show_results(self, results):
+        """一次性将已存储的结果写入文本框"""
+        self.result_text.config(state=tk.NORMAL)
         
-        # 插入新结果
-        result_str = (f"起点: ({start_point[0]}, {start_point[1]})\n"
-                     f"终点: ({end_point[0]}, {end_point[1]})\n"
-                     f"像素距离: {pixel_distance:.2f}\n"
-                     f"实际长度: {real_distance:.2f}\n\n")
+        # 插入新结果，非首条记录前添加分隔线
+        parts = []
+        for result in results:
+            if self.results_shown:
+                parts.append("-" * 50 + "\n")
+            self.results_shown = True
+            start_point, end_point = result['start_point'], result['end_point']
+            parts.append(f"起点: ({start_point[0]}, {start_point[1]})\n"
+                         f"终点: ({end_point[0]}, {end_point[1]})\n"
+                         f"像素距离: {result['pixel_distance']:.2f}\n"
+                         f"实际长度: {result['real_distance']:.2f}\n\n")
         
-        self.result_text.insert(tk.END, result_str)
+        self.result_text.insert(tk.END, "".join(parts))
         self.result_text.see(tk.END)  # 滚动到最后
         self.result_text.config(state=tk.DISABLED)
+        
+    def draw_results(self, results):
+        """测量时将已存储的结果绘制为永久线段"""
+        if not self.is_measuring:
+            return
+        for result in results:
+            start_point, end_point = result['start_point'], result['end_point']
+            monitor = self.monitor_at(*start_point)
+            canvas = self.capture_windows[self.monitors.index(monitor)].canvas
+            line_id = canvas.create_line(
+                start_point[0] - monitor['x'], start_point[1] - monitor['y'],
+                end_point[0] - monitor['x'], end_point[1] - monitor['y'],
+                fill=self.line_color, width=self.line_width
+            )
+            self.measurement_lines.append({
+                'canvas': canvas,
+                'line_id': line_id,
+                'start_point': tuple(start_point),
+                'end_point': tuple(end_point),
+                'pixel_distance': result['pixel_distance'],
+                'real_distance': result['real_distance']
+            })
+            
+    def open_image(self, path=None):
+        """在可滚动的查看窗口中打开图片文件"""
+        if path is None:
+            path = filedialog.askopenfilename(
+                title="打开图片",
+                filetypes=[("图片", "*.png *.jpg *.jpeg *.bmp *.gif *.tif *.tiff"),
+                           ("所有文件", "*.*")])
+            if not path:
+                return None
+        
+        try:
+            image = Image.open(path)
+            image.load()
+            source = file_source(path)
+        except OSError as e:
+            messagebox.showerror("错误", f"无法打开图片: {e}")
+            return None
+        
+        self.show_image(image, os.path.basename(path), source)
+        
+    def show_image(self, image, title, source=None, monitor=None):
+        """在可滚动的查看窗口中显示PIL图片，按该显示器的比例测量"""
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        
+        # 带滚动条的画布，可显示超出屏幕的图片
+        canvas = tk.Canvas(window, highlightthickness=0,
+                           width=min(image.width, self.root.winfo_screenwidth() - 100),
+                           height=min(image.height, self.root.winfo_screenheight() - 150))
+        x_scroll = ttk.Scrollbar(window, orient=tk.HORIZONTAL, command=canvas.xview)
+        y_scroll = ttk.Scrollbar(window, orient=tk.VERTICAL, command=canvas.yview)
+        canvas.configure(xscrollcommand=x_scroll.set, yscrollcommand=y_scroll.set,
+                         scrollregion=(0, 0, image.width, image.height))
+        bar = ttk.Frame(window)
+        bar.pack(side=tk.BOTTOM, fill=tk.X)
+        canvas.info_label = ttk.Label(bar, text="在图片上拖动进行测量")
+        canvas.info_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(bar, text="识别比例尺",
+                  command=lambda: self.detect_image_scale_bar(canvas, image)).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(bar, text="校准",
+                  command=lambda: self.start_image_calibration(canvas)).pack(side=tk.RIGHT, padx=5)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        x_scroll.pack(side=tk.BOTTOM, fill=tk.X)
+        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # 保留图片引用，Tk不会保留
+        canvas.photo = ImageTk.PhotoImage(image)
+        canvas.create_image(0, 0, image=canvas.photo, anchor=tk.NW)
+        canvas.bind('<MouseWheel>', lambda e: canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        
+        # 以图片坐标测量，长度可跨越整张图片
+        canvas.start_point = None
+        canvas.temp_line_id = None
+        canvas.calibrating = False
+        canvas.bind('<Button-1>', self.on_image_mouse_down)
+        canvas.bind('<B1-Motion>', self.on_image_mouse_drag)
+        canvas.bind('<ButtonRelease-1>', self.on_image_mouse_up)
+        
+        # 查看窗口获得焦点时使用其来源和缓存的比例
+        canvas.source = source
+        canvas.monitor = monitor
+        window.bind('<FocusIn>', lambda e: self.set_source(canvas.source))
+        self.set_source(source)
+        
+        self.status_label.config(text=f"状态: 已打开 {title}", foreground="green")
+        
+    def start_image_calibration(self, canvas):
+        canvas.calibrating = True
+        canvas.info_label.config(text="请拖过一段已知长度的参照")
+        
+    def detect_image_scale_bar(self, canvas, image):
+        """在查看窗口的图片中查找并标出比例尺，然后据此校准"""
+        bar = detect_scale_bar(image)
+        canvas.delete('scale_bar')
+        if bar is None:
+            canvas.info_label.config(text="未找到比例尺")
+            return
+        x, y, length, thickness = bar
+        canvas.create_rectangle(x - 3, y - 3, x + length + 3, y + thickness + 3, 
+                                outline='magenta', width=2, tags='scale_bar')
+        canvas.yview_moveto(max(0.0, (y - canvas.winfo_height() / 2) / image.height))
+        self.calibrate_from_distance(length, canvas.source, canvas.winfo_toplevel(), canvas.monitor)
+        
+    def image_point(self, event):
+        """将查看窗口中的事件位置转换为图片坐标"""
+        canvas = event.widget
+        return (int(canvas.canvasx(event.x)), int(canvas.canvasy(event.y)))
+        
+    def on_image_mouse_down(self, event):
+        """图片查看窗口中的鼠标按下事件"""
+        event.widget.start_point = self.image_point(event)
+        
+    def on_image_mouse_drag(self, event):
+        """图片查看窗口中的鼠标拖动事件"""
+        canvas = event.widget
+        if not canvas.start_point:
+            return
+        
+        # 拖出边缘时自动滚动，以到达图片其余部分
+        if event.y < 0 or event.y > canvas.winfo_height():
+            canvas.yview_scroll(-1 if event.y < 0 else 1, "units")
+        if event.x < 0 or event.x > canvas.winfo_width():
+            canvas.xview_scroll(-1 if event.x < 0 else 1, "units")
+        
+        current_point = self.image_point(event)
+        if canvas.temp_line_id:
+            canvas.delete(canvas.temp_line_id)
+        canvas.temp_line_id = canvas.create_line(
+            canvas.start_point[0], canvas.start_point[1],
+            current_point[0], current_point[1],
+            fill=self.line_color, width=self.line_width
+        )
+        
+        distance = math.hypot(current_point[0] - canvas.start_point[0],
+                              current_point[1] - canvas.start_point[1])
+        canvas.info_label.config(text=f"像素: {distance:.1f}    "
+                                      f"实际: {distance / self.scale_for(canvas.monitor):.2f}")
+        
+    def on_image_mouse_up(self, event):
+        """图片查看窗口中的鼠标释放事件，线段保留到窗口关闭"""
+        canvas = event.widget
+        if canvas.start_point and canvas.temp_line_id:
+            end_point = self.image_point(event)
+            distance = math.hypot(end_point[0] - canvas.start_point[0],
+                                  end_point[1] - canvas.start_point[1])
+            real_distance = distance / self.scale_for(canvas.monitor)
+            if canvas.calibrating:
+                canvas.calibrating = False
+                canvas.delete(canvas.temp_line_id)
+                canvas.start_point = None
+                canvas.temp_line_id = None
+                canvas.info_label.config(text="在图片上拖动进行测量")
+                self.calibrate_from_distance(distance, canvas.source, canvas.winfo_toplevel(), 
+                                             canvas.monitor)
+                return
+            canvas.coords(canvas.temp_line_id, *canvas.start_point, *end_point)
+            self.record_result(distance, real_distance, canvas.start_point, end_point)
+            canvas.info_label.config(text=f"实际: {real_distance:.2f}")
+        canvas.start_point = None
+        canvas.temp_line_id = None
+        
+    def start_scroll_capture(self):
+        """将屏幕下滚动的文档拼接为一张可测量的图片"""
+        if self.is_measuring:
+            self.stop_measurement()
+        left, top, right, bottom = self.capture_bbox()
+        monitor = self.monitor_at(left, top)
+        self.root.iconify()
+        
+        # 显示器顶部的细长控制栏，只截取控制栏下方的画面
+        self.scroll_window = tk.Toplevel(self.root)
+        self.scroll_window.overrideredirect(True)
+        self.scroll_window.attributes('-topmost', True)
+        self.scroll_window.configure(bg='lightyellow')
+        self.scroll_window.geometry(f"{monitor['width']}x32+{monitor['x']}+{monitor['y']}")
+        self.scroll_label = tk.Label(self.scroll_window, 
+                                     text="请缓慢滚动文档，然后点击完成",
+                                     bg='lightyellow', fg='black',
+                                     font=("微软雅黑", 10, "bold"))
+        self.scroll_label.pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.scroll_window, text="完成",
+                  command=self.finish_scroll_capture).pack(side=tk.RIGHT, padx=10)
+        
+        top = max(top, monitor['y'] + 32)
+        self.scroll_capture = ScrollCapture(bbox=(left, top, right, bottom))
+        self.scroll_source = self.source
+        self.scroll_monitor = monitor if len(self.monitors) > 1 else None
+        self.scroll_stop = threading.Event()
+        self.scroll_thread = threading.Thread(target=self.scroll_capture_worker, daemon=True)
+        self.scroll_thread.start()
+        self.root.after(200, self.update_scroll_status)
+        
+    def scroll_capture_worker(self):
+        """持续截取并拼接画面直到停止，在后台线程中运行"""
+        capture, stop = self.scroll_capture, self.scroll_stop
+        while not stop.is_set():
+            started = time.time()
+            try:
+                capture.grab()
+            except OSError as e:
+                capture.error = e
+                return
+            stop.wait(max(0.0, 0.1 - (time.time() - started)))
+            
+    def update_scroll_status(self):
+        """在控制栏中显示滚动截图进度"""
+        if not self.scroll_window:
+            return
+        capture = self.scroll_capture
+        if capture.lost:
+            self.scroll_label.config(text="配准丢失，请滚动回上次截取的位置",
+                                     fg='red')
+        else:
+            self.scroll_label.config(text=f"请缓慢滚动文档，然后点击完成    "
+                                          f"帧数: {capture.frames}    高度: {capture.bottom - capture.top}像素",
+                                     fg='black')
+        self.root.after(200, self.update_scroll_status)
+        
+    def finish_scroll_capture(self):
+        self.scroll_stop.set()
+        self.scroll_thread.join()
+        self.scroll_window.destroy()
+        self.scroll_window = None
+        self.root.deiconify()
+        
+        capture, self.scroll_capture = self.scroll_capture, None
+        if capture.error:
+            messagebox.showerror("错误", f"截屏失败: {capture.error}")
+            return
+        image = capture.stitched_image()
+        if image is None:
+            messagebox.showinfo("滚动截图", "未检测到滚动")
+            return
+        self.show_image(image, "滚动截图", self.scroll_source, self.scroll_monitor)
+
+def get_monitors(root):
+    """以字典返回各显示器的名称、x、y、宽度和高度（桌面坐标）"""
+    if mss is not None:
+        with mss.mss() as sct:
+            return [{'name': f"显示器 {i}", 'x': m['left'], 'y': m['top'],
+                     'width': m['width'], 'height': m['height']}
+                    for i, m in enumerate(sct.monitors[1:], 1)]
+    # 没有mss时Tk只能获取主屏幕
+    return [{'name': "显示器 1", 'x': 0, 'y': 0,
+             'width': root.winfo_screenwidth(), 'height': root.winfo_screenheight()}]
+
+def foreground_window_pid():
+    """前台窗口的进程id，无法获取时返回None"""
+    if sys.platform != 'win32':
+        return None
+    user32 = ctypes.windll.user32
+    pid = ctypes.c_ulong()
+    user32.GetWindowThreadProcessId(user32.GetForegroundWindow(), ctypes.byref(pid))
+    return pid.value
+
+def monitor_bbox(monitor):
+    return (monitor['x'], monitor['y'],
+            monitor['x'] + monitor['width'], monitor['y'] + monitor['height'])
+
+_grabbers = threading.local()
+
+def grab_region(bbox):
+    """截取 (left, top, right, bottom) 屏幕区域，返回RGB图片
+    
+    mss只复制该区域，开销与区域大小成正比；ImageGrab在部分平台上
+    会截取整个桌面后再裁剪。
+    """
+    if mss is None:
+        return ImageGrab.grab(bbox=bbox, all_screens=True)
+    
+    # mss句柄按线程区分
+    sct = getattr(_grabbers, 'sct', None)
+    if sct is None:
+        sct = _grabbers.sct = mss.mss()
+    left, top, right, bottom = bbox
+    try:
+        shot = sct.grab({'left': left, 'top': top, 'width': right - left, 'height': bottom - top})
+    except mss.ScreenShotError as e:
+        raise OSError(str(e))
+    return Image.frombytes('RGB', shot.size, shot.bgra, 'raw', 'BGRX')
+
+def render_overlay(width, height, scale_factor, spacing, color, rulers, grid):
+    """将边缘标尺和每隔 `spacing` 单位的网格渲染为一张RGBA图片
+    
+    线条通过NumPy切片一次写入而非逐条绘制，开销不随网格密度增长；
+    只有标尺刻度文字使用ImageDraw。
+    """
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    rgba = ImageColor.getrgb(color)[:3] + (255,)
+    step = spacing * scale_factor  # 主刻度线之间的像素数
+    
+    if grid and step >= 4:
+        pixels[:, np.arange(0, width, step).astype(int)] = rgba
+        pixels[np.arange(0, height, step).astype(int), :] = rgba
+        
+    if rulers:
+        # 十分之一、二分之一和整间距刻度，跳过过密的刻度
+        for divisions, length in ((10, 6), (2, 10), (1, 16)):
+            tick = step / divisions
+            if tick < 4:
+                continue
+            pixels[:length, np.arange(0, width, tick).astype(int)] = rgba
+            pixels[np.arange(0, height, tick).astype(int), :length] = rgba
+            
+    image = Image.fromarray(pixels, 'RGBA')
+    if rulers and step >= 4:
+        # 在有足够空间的主刻度处标注数值
+        every = max(1, math.ceil(40 / step))
+        draw = ImageDraw.Draw(image)
+        for i in range(every, int(width / step) + 1, every):
+            draw.text((int(i * step) + 2, 16), f"{i * spacing:g}", fill=rgba)
+        for i in range(every, int(height / step) + 1, every):
+            draw.text((18, int(i * step) + 2), f"{i * spacing:g}", fill=rgba)
+    return image
+
+def file_source(path):
+    """图片文件的来源 (key, label)，以文件内容哈希为键"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return ("file:" + digest.hexdigest(), os.path.basename(path))
+
+def detect_scale_bar(image, dark_level=100, min_length=20, min_thickness=3, max_thickness=20):
+    """查找最长的加粗水平深色条，返回 (x, y, length, thickness)，未找到时返回None
+    
+    通过游程分析逐行查找深色像素段；比例尺由连续多行上相同的
+    像素段叠成，比表格线粗但仍然较细。触及左右边缘的
+    像素段属于标题栏、任务栏等窗口边框，
+    上下相邻行为浅色的比例尺优先。
+    """
+    dark = np.asarray(image.convert('L')) < dark_level
+    height, width = dark.shape
+    edges = np.diff(np.pad(dark, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+    lengths = ends - starts
+    keep = (lengths >= min_length) & (starts > 0) & (ends < width)
+    rows, starts, lengths = rows[keep], starts[keep], lengths[keep]
+    if len(rows) == 0:
+        return None
+    
+    # 将连续行上相同的像素段分组
+    order = np.lexsort((rows, lengths, starts))
+    rows, starts, lengths = rows[order], starts[order], lengths[order]
+    new_group = np.ones(len(rows), dtype=bool)
+    new_group[1:] = (starts[1:] != starts[:-1]) | (lengths[1:] != lengths[:-1]) | (rows[1:] != rows[:-1] + 1)
+    group_starts = np.flatnonzero(new_group)
+    thickness = np.diff(np.append(group_starts, len(rows)))
+    bar_lengths = lengths[group_starts]
+    
+    candidates = np.flatnonzero((thickness >= min_thickness) & (thickness <= max_thickness) & 
+                                (thickness * 4 <= bar_lengths))
+    if len(candidates) == 0:
+        return None
+    
+    # 每个比例尺正上方和正下方一行中的深色像素数，
+    # 图像外的行视为浅色
+    dark_count = np.pad(np.cumsum(dark, axis=1), ((1, 1), (1, 0)))
+    x = starts[group_starts[candidates]]
+    length = bar_lengths[candidates]
+    above = rows[group_starts[candidates]]  # 上方一行在填充后数组中的索引
+    below = above + thickness[candidates] + 1
+    isolated = ((dark_count[above, x + length] - dark_count[above, x] < length // 4) & 
+                (dark_count[below, x + length] - dark_count[below, x] < length // 4))
+    
+    # 孤立的比例尺优先，其次取最长的
+    best = candidates[np.lexsort((length, isolated))[-1]]
+    first = group_starts[best]
+    return (int(starts[first]), int(rows[first]), int(bar_lengths[best]), int(thickness[best]))
+
+def row_correlation(reference, frame, min_overlap):
+    """返回 (dy, score)，使 frame[y] ~ reference[y + dy]，score 范围为 [-1, 1]
+    
+    只对重叠行计算归一化互相关，通过沿列方向的FFT一次算出
+    所有垂直位移。与循环相位相关不同，它能找到最大为
+    高度减去 min_overlap 的位移，且空白的重叠区域
+    永远不会被匹配。
+    """
+    reference = reference.astype(np.float64)
+    frame = frame.astype(np.float64)
+    height, width = reference.shape
+    size = 2 * height
+    # products[dy] = reference[y + dy] * frame[y] 之和，负的 dy 循环回绕
+    spectrum = np.fft.rfft(reference, n=size, axis=0) * np.conj(np.fft.rfft(frame, n=size, axis=0))
+    products = np.fft.irfft(spectrum.sum(axis=1), n=size)
+    
+    # 由行累加和求出重叠行上的各项和
+    def overlap_sums(rows, lo, hi):
+        cumulative = np.concatenate(([0.0], np.cumsum(rows)))
+        return cumulative[hi] - cumulative[lo]
+    
+    shifts = np.arange(min_overlap - height, height - min_overlap + 1)
+    ref_lo, ref_hi = np.maximum(shifts, 0), height + np.minimum(shifts, 0)
+    frame_lo, frame_hi = np.maximum(-shifts, 0), height - np.maximum(shifts, 0)
+    count = (height - np.abs(shifts)) * width
+    sum_ref = overlap_sums(reference.sum(axis=1), ref_lo, ref_hi)
+    sum_frame = overlap_sums(frame.sum(axis=1), frame_lo, frame_hi)
+    var_ref = overlap_sums((reference ** 2).sum(axis=1), ref_lo, ref_hi) - sum_ref ** 2 / count
+    var_frame = overlap_sums((frame ** 2).sum(axis=1), frame_lo, frame_hi) - sum_frame ** 2 / count
+    covariance = products[shifts % size] - sum_ref * sum_frame / count
+    
+    # 几乎没有对比度的重叠区域不能作为依据
+    textured = (var_ref > count) & (var_frame > count)
+    score = np.full(len(shifts), -1.0)
+    score[textured] = covariance[textured] / np.sqrt(var_ref[textured] * var_frame[textured])
+    best = int(np.argmax(score))
+    return int(shifts[best]), float(score[best])
+
+class ScrollCapture:
+    """将屏幕区域下滚动文档的各帧拼接为一张图片。
+    
+    每一帧在降采样的灰度副本上通过FFT行相关
+    与上一个已配准帧配准，然后在原始分辨率下精确调整。
+    每帧只保留新露出的行，作为条带放在拼接后的偏移位置。
+    配准失败的帧会被跳过，直到文档滚动回
+    与上一个已配准帧重叠的位置。
+    """
+    
+    REGISTER_SIZE = 384  # 行相关使用的最长边
+    MIN_CORRELATION = 0.7  # 更弱的匹配视为配准失败
+    MIN_OVERLAP = 32  # 两帧配准所需的最少重叠行数
+    CHANGE_LEVEL = 8  # 视为像素变化的灰度差
+    LOST_AFTER = 3  # 连续失败多少帧后视为配准丢失
+    
+    def __init__(self, bbox):
+        self.bbox = bbox  # 截取的屏幕区域
+        self.band = None  # 滚动区域的 (top, bottom) 行，首次移动时确定
+        self.strips = []  # (拼接y坐标, PIL图片) 对
+        self.first_frame = None
+        self.previous = None  # 上一已配准帧的灰度图
+        self.position = 0  # 当前帧滚动区域顶部的拼接y坐标
+        self.top = 0
+        self.bottom = 0
+        self.frames = 0
+        self.failures = 0  # 连续配准失败的帧数
+        self.error = None
+        
+    @property
+    def lost(self):
+        return self.failures >= self.LOST_AFTER
+        
+    def grab(self):
+        """截取区域并加入拼接，已拼接时返回True"""
+        return self.add_frame(grab_region(self.bbox))
+    
+    def add_frame(self, frame):
+        frame = frame.convert('RGB')
+        gray = np.asarray(frame.convert('L'), dtype=np.float32)
+        if self.previous is None:
+            self.first_frame = frame
+            self.previous = gray
+            return False
+        
+        # 只有发生变化的行列参与计算，可快速跳过静止帧，
+        # 并避免静态工具栏干扰配准
+        changed = np.abs(gray - self.previous) > self.CHANGE_LEVEL
+        rows = np.flatnonzero(changed.any(axis=1))
+        columns = np.flatnonzero(changed.any(axis=0))
+        if len(rows) < 2:
+            return False
+        top, bottom = self.band or (int(rows[0]), int(rows[-1]) + 1)
+        shift = self.register(self.previous[top:bottom, columns[0]:columns[-1] + 1],
+                              gray[top:bottom, columns[0]:columns[-1] + 1])
+        if shift is None:
+            self.failures += 1
+            return False
+        self.failures = 0
+        if not shift:
+            return False
+        
+        if self.band is None:
+            top, bottom = self.band = self.scrolling_rows(gray, top, bottom, shift)
+            self.strips.append((0, self.first_frame.crop((0, top, frame.width, bottom))))
+            self.bottom = bottom - top
+            self.first_frame = None
+        
+        # 只保留该帧在已拼接区域上方或下方新露出的行
+        height = bottom - top
+        self.position += shift
+        if self.position < self.top:
+            rows_new = self.top - self.position
+            self.strips.append((self.position, frame.crop((0, top, frame.width, top + rows_new))))
+            self.top = self.position
+        if self.position + height > self.bottom:
+            rows_new = self.position + height - self.bottom
+            self.strips.append((self.bottom, frame.crop((0, bottom - rows_new, frame.width, bottom))))
+            self.bottom = self.position + height
+        self.previous = gray
+        self.frames += 1
+        return True
+    
+    def scrolling_rows(self, gray, top, bottom, shift):
+        """将变化行范围(top, bottom)扩展到未变化但随内容滚动的行
+        
+        空白行在两帧之间看起来没有变化，但与静态工具栏不同，
+        它们也与上一帧相距 `shift` 行的内容一致。
+        """
+        height = len(gray)
+        
+        def moves(row):
+            # gray[y] 显示的是 self.previous 在 y + shift 处的内容
+            pairs = [(gray[y], self.previous[y + shift]) for y in (row, row - shift) 
+                     if 0 <= y < height and 0 <= y + shift < height]
+            return all(not (np.abs(a - b) > self.CHANGE_LEVEL).any() for a, b in pairs)
+        
+        while top > 0 and moves(top - 1):
+            top -= 1
+        while bottom < height and moves(bottom):
+            bottom += 1
+        return top, bottom
+    
+    def register(self, previous, current):
+        """返回内容向上移动的行数，配准失败时返回None"""
+        height, width = previous.shape
+        factor = -(-max(height, width) // self.REGISTER_SIZE)
+        if height < 8 * factor or width < 8 * factor or height <= self.MIN_OVERLAP:
+            return None
+        
+        # 用块平均后的缩小图计算粗略位移
+        small_previous = np.asarray(Image.fromarray(previous).reduce(factor))
+        small_current = np.asarray(Image.fromarray(current).reduce(factor))
+        dy, score = row_correlation(small_previous, small_current, 
+                                    min(self.MIN_OVERLAP // factor, len(small_previous) - 1))
+        if score < self.MIN_CORRELATION:
+            return None
+        
+        # 在原始分辨率下比较重叠部分，精确到单行。
+        # 每一行都参与比较，跳行会让成对变化的内容错位一行；
+        # 误差相同时取最接近粗略估计的位移
+        best, best_error = None, None
+        for shift in sorted(range(dy * factor - factor, dy * factor + factor + 1),
+                            key=lambda shift: abs(shift - dy * factor)):
+            if abs(shift) > height - self.MIN_OVERLAP:
+                continue
+            if shift >= 0:
+                a, b = previous[shift:, ::4], current[:height - shift, ::4]
+            else:
+                a, b = previous[:height + shift, ::4], current[-shift:, ::4]
+            error = float(np.abs(a - b).mean())
+            if best_error is None or error < best_error:
+                best, best_error = shift, error
+        return best
+    
+    def stitched_image(self):
+        """将条带合成为一张图片，未拼接任何内容时返回None"""
+        if not self.strips:
+            return None
+        image = Image.new('RGB', (self.strips[0][1].width, self.bottom - self.top))
+        for y, strip in self.strips:
+            image.paste(strip, (0, y - self.top))
+        return image
+
+class MeasurementRPCServer:
+    """基于Unix域套接字的本地JSON-RPC 2.0自动化接口。
+    
+    请求为按换行分隔的JSON对象或批量数组。服务器在后台线程中运行
+    自己的asyncio事件循环；所有涉及Tk的操作都会进入队列，
+    由Tk主循环通过root.after轮询执行。
+    """
+    
+    POLL_MS = 15  # Tk队列轮询间隔
+    READ_LIMIT = 64 * 1024 * 1024  # 单行请求上限，批量调用可能很大
+    HIGH_WATER = 1024 * 1024  # 客户端缓冲超过此值时等待或断开
+    
+    def __init__(self, app, path):
+        self.app = app
+        self.path = path
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.error = None
+        self.clients = set()
+        self.subscribers = set()
+        self.tk_queue = queue.Queue()
+        self.pending_results = []  # 已添加但尚未在Tk中显示的结果
+        self.pending_lock = threading.Lock()
+        self.methods = {
+            'get_scale': self.rpc_get_scale,
+            'set_scale': self.rpc_set_scale,
+            'open_image': self.rpc_open_image,
+            'measure': self.rpc_measure,
+            'add': self.rpc_add,
+            'get_results': self.rpc_get_results,
+            'clear_results': self.rpc_clear_results,
+            'subscribe': self.rpc_subscribe,
+            'unsubscribe': self.rpc_unsubscribe,
+        }
+        
+    def start(self):
+        """启动asyncio线程和Tk队列轮询"""
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self.thread.start()
+        ready.wait()
+        if self.error:
+            raise self.error
+        self.app.rpc_server = self
+        self.app.root.after(self.POLL_MS, self._drain_tk_queue)
+        
+    def stop(self):
+        self.app.rpc_server = None
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=2)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+            
+    def _run(self, ready):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._remove_stale_socket()
+            self.server = self.loop.run_until_complete(asyncio.start_unix_server(
+                self.handle_client, path=self.path, limit=self.READ_LIMIT))
+        except (OSError, NotImplementedError, AttributeError) as e:
+            self.error = e
+            ready.set()
+            return
+        ready.set()
+        self.loop.run_forever()
+        
+        # 关闭客户端连接并等待其处理结束
+        self.server.close()
+        for writer in list(self.clients):
+            writer.close()
+        self.loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(self.loop),
+                                                    return_exceptions=True))
+        self.loop.close()
+        
+    def _remove_stale_socket(self):
+        """删除上次运行遗留的套接字，绝不删除仍在使用的套接字或其他文件"""
+        try:
+            mode = os.stat(self.path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise FileExistsError(errno.EEXIST, "路径已存在且不是套接字", self.path)
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(self.path)
+        except ConnectionRefusedError:
+            os.unlink(self.path)
+            return
+        finally:
+            probe.close()
+        raise OSError(errno.EADDRINUSE, "另一个实例正在此套接字上提供服务", self.path)
+        
+    def _drain_tk_queue(self):
+        """在Tk线程中执行队列任务，每次处理全部待办项"""
+        while True:
+            try:
+                func, args, future = self.tk_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                result = func(*args)
+            except Exception as e:
+                if future:
+                    future.set_exception(e)
+            else:
+                if future:
+                    future.set_result(result)
+        if self.app.rpc_server is self:
+            self.app.root.after(self.POLL_MS, self._drain_tk_queue)
+            
+    def call_in_tk(self, func, *args):
+        """将func排入Tk线程队列，并返回可等待其结果的对象"""
+        future = concurrent.futures.Future()
+        self.tk_queue.put((func, args, future))
+        return asyncio.wrap_future(future)
+    
+    def post_to_tk(self, func, *args):
+        """将func排入Tk线程队列，不等待结果"""
+        self.tk_queue.put((func, args, None))
+        
+    def show_in_tk(self, results):
+        """将新增结果排队显示，每个轮询周期合并为一次更新"""
+        with self.pending_lock:
+            queued = bool(self.pending_results)
+            self.pending_results.extend(results)
+        if not queued:
+            self.post_to_tk(self._show_pending)
+            
+    def _show_pending(self):
+        with self.pending_lock:
+            results, self.pending_results = self.pending_results, []
+        self.app.show_results(results)
+        self.app.draw_results(results)
+        
+    def publish(self, results):
+        """将新结果推送给订阅者，可在任意线程调用"""
+        if self.subscribers and self.loop:
+            self.loop.call_soon_threadsafe(self._broadcast, results)
+            
+    def _broadcast(self, results):
+        line = self._encode({'jsonrpc': '2.0', 'method': 'result', 'params': {'results': results}})
+        for writer in list(self.subscribers):
+            # 断开不再读取的订阅者，避免无限缓冲
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > self.HIGH_WATER:
+                self.subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+            
+    @staticmethod
+    def _encode(message):
+        return json.dumps(message, separators=(',', ':')).encode() + b"\n"
+    
+    async def handle_client(self, reader, writer):
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.handle_payload(line, writer)
+                if response is not None:
+                    writer.write(self._encode(response))
+                    # 仅在客户端读取落后时才等待套接字
+                    if writer.transport.get_write_buffer_size() > self.HIGH_WATER:
+                        await writer.drain()
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            self.subscribers.discard(writer)
+            writer.close()
+            
+    async def handle_payload(self, line, writer):
+        try:
+            payload = json.loads(line)
+        except ValueError:
+            return self._error(None, -32700, "Parse error")
+        
+        if isinstance(payload, list):
+            if not payload:
+                return self._error(None, -32600, "Invalid Request")
+            responses = [await self.handle_request(request, writer) for request in payload]
+            responses = [response for response in responses if response is not None]
+            return responses or None
+        return await self.handle_request(payload, writer)
+    
+    async def handle_request(self, request, writer):
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return self._error(None, -32600, "Invalid Request")
+        request_id = request.get('id')
+        method = self.methods.get(request['method'])
+        params = request.get('params', [])
+        try:
+            if method is None:
+                response = self._error(request_id, -32601, "Method not found")
+            else:
+                if isinstance(params, dict):
+                    result = method(writer, **params)
+                elif isinstance(params, list):
+                    result = method(writer, *params)
+                else:
+                    raise ValueError("params must be an array or object")
+                if asyncio.iscoroutine(result):
+                    result = await result
+                response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except (TypeError, ValueError, KeyError, IndexError) as e:
+            response = self._error(request_id, -32602, f"Invalid params: {e}")
+        except Exception as e:
+            response = self._error(request_id, -32603, f"Internal error: {e}")
+        
+        # 通知(无id)不返回任何响应，错误也不返回
+        if 'id' not in request:
+            return None
+        return response
+    
+    @staticmethod
+    def _error(request_id, code, message):
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+    
+    def _measure(self, segments):
+        """按线段起点所在显示器的比例测量 [x1, y1, x2, y2] 线段"""
+        measurements = []
+        for segment in segments:
+            x1, y1, x2, y2 = coordinates = [float(value) for value in segment]
+            if not all(math.isfinite(value) for value in coordinates):
+                raise ValueError("segment coordinates must be finite numbers")
+            distance = math.hypot(x2 - x1, y2 - y1)
+            real_distance = distance / self.app.scale_at(x1, y1)
+            if not math.isfinite(real_distance):
+                raise ValueError("segment is too long to measure")
+            measurements.append(((x1, y1), (x2, y2), distance, real_distance))
+        return measurements
+    
+    def _monitor(self, monitor):
+        """按编号N("显示器 N")获取显示器，None表示全局比例"""
+        if monitor is None:
+            return None
+        number = int(monitor)
+        if not 1 <= number <= len(self.app.monitors):
+            raise ValueError(f"no monitor {monitor}")
+        return self.app.monitors[number - 1]
+    
+    @staticmethod
+    def _load_image(path):
+        image = Image.open(path)
+        image.load()
+        return image, file_source(path)
+    
+    # RPC方法，第一个参数为调用方客户端的writer
+    
+    def rpc_get_scale(self, writer, monitor=None):
+        return self.app.scale_for(self._monitor(monitor))
+    
+    async def rpc_set_scale(self, writer, scale, monitor=None):
+        scale = float(scale)
+        if not (math.isfinite(scale) and scale > 0):
+            raise ValueError("scale must be a positive finite number")
+        monitor = self._monitor(monitor)
+        # 比例只在Tk线程中修改，与手动输入比例相同
+        app = self.app
+        await self.call_in_tk(lambda: app.use_scale(scale, app.source, monitor))
+        return scale
+    
+    async def rpc_open_image(self, writer, path):
+        # 在工作线程中解码，仅在Tk中创建查看窗口
+        try:
+            image, source = await self.loop.run_in_executor(None, self._load_image, str(path))
+        except OSError as e:
+            raise ValueError(f"cannot open image: {e}")
+        await self.call_in_tk(self.app.show_image, image, os.path.basename(path), source)
+        return {'width': image.width, 'height': image.height}
+    
+    def rpc_measure(self, writer, segments):
+        return [{'pixel_distance': pixel_distance, 'real_distance': real_distance}
+                for _, _, pixel_distance, real_distance in self._measure(segments)]
+    
+    def rpc_add(self, writer, segments):
+        results = self.app.store_results(self._measure(segments))
+        if results:
+            self.show_in_tk(results)
+        return results
+    
+    def rpc_get_results(self, writer, start=0, count=None):
+        start = int(start)
+        end = None if count is None else start + int(count)
+        with self.app.results_lock:
+            return self.app.results[start:end]
+        
+    async def rpc_clear_results(self, writer):
+        await self.call_in_tk(self.app.clear_results)
+        return True
+    
+    def rpc_subscribe(self, writer):
+        self.subscribers.add(writer)
+        return True
+    
+    def rpc_unsubscribe(self, writer):
+        self.subscribers.discard(writer)
+        return True
 
 def main():
+    parser = argparse.ArgumentParser(description="可视化拖拽测量尺")
+    parser.add_argument("--rpc-socket", metavar="PATH",
+                        help="在此Unix套接字上提供JSON-RPC自动化接口")
+    args = parser.parse_args()
    
     root = tk.Tk()
     app = PersistentVisualRuler(root)
+    
+    server = None
+    if args.rpc_socket:
+        server = MeasurementRPCServer(app, args.rpc_socket)
+        try:
+            server.start()
+        except (OSError, NotImplementedError, AttributeError) as e:
+            server = None
+            messagebox.showerror("错误", f"无法启动自动化接口: {e}")
+            
     root.mainloop()
+    
+    if server:
+        server.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,16 +1,37 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import math
+import os
+import sys
+import ctypes
+import json
+import hashlib
+import stat
+import errno
+import socket
+import queue
+import asyncio
+import concurrent.futures
+import argparse
+import numpy as np
 import pyautogui
-from PIL import Image, ImageGrab
+from PIL import Image, ImageGrab, ImageTk, ImageDraw, ImageColor
 import threading
 import time
 
+try:
+    import mss  # Optional, grabs only the requested screen region
+except ImportError:
+    mss = None
+
+# Calibrated scales per document source
+SCALE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".pixel_ruler_scales.json")
+
 class PersistentVisualRuler:
     def __init__(self, root):
         self.root = root
         self.root.title("Visual Drag Measurement Ruler")
-        self.root.geometry("600x650")
+        self.root.geometry("600x880")
         self.root.resizable(False, False)
         
         # Measurement state
@@ -26,19 +47,50 @@ class PersistentVisualRuler:
         self.overlay_window = None
         self.overlay_label = None
         
-        # Fullscreen transparent window for event capture
-        self.capture_window = None
-        self.canvas = None
+        # Fullscreen transparent window per monitor for event capture
+        self.monitors = get_monitors(self.root)
+        self.capture_windows = []
+        self.canvas = None  # Canvas of the monitor being dragged on
+        self.monitor = None
+        self.selecting_region = False
+        self.region = None  # Region of interest for frame grabs
+        
+        # Per-monitor scale overrides for mixed-DPI setups
+        self.monitor_scales = {}
         
         # Line color and style
         self.line_color = "red"
         self.line_width = 2
         
+        # Grid and ruler overlay, rendered once per inputs and cached
+        self.grid_spacing = 1.0  # In units
+        self.grid_color = "white"
+        self.overlay_cache = {}
+        
         # Store all measurement lines
         self.measurement_lines = []  # Store (line_id, start_point, end_point, distance, real_distance)
         
+        # Measurement session shared with the automation API
+        self.results = []
+        self.results_lock = threading.Lock()
+        self.results_shown = False  # Whether the text box lists any result yet
+        self.rpc_server = None
+        
+        # Scroll capture state
+        self.scroll_capture = None
+        self.scroll_window = None
+        
+        # Calibration, scales are cached per source (key, label)
+        self.calibrating = False
+        self.source = None
+        self.last_window_title = None
+        self.scale_cache = self.load_scale_cache()
+        
         self.setup_ui()
         
+        # Follow the foreground document window
+        self.root.after(500, self.poll_active_window)
+        
     def setup_ui(self):
         # Main frame
         main_frame = ttk.Frame(self.root, padding="15")
@@ -58,13 +110,34 @@ class PersistentVisualRuler:
                               font=("Arial", 8), foreground="gray")
         scale_help.grid(row=0, column=0, columnspan=3, sticky=tk.W, pady=(0,5))
         
-        ttk.Label(scale_frame, text="Scale (pixels/unit):").grid(row=1, column=0, padx=5)
+        ttk.Label(scale_frame, text="Monitor:").grid(row=1, column=0, padx=5, pady=(0,5))
+        self.monitor_var = tk.StringVar(value="All monitors")
+        monitor_combo = ttk.Combobox(scale_frame, textvariable=self.monitor_var, 
+                                    values=["All monitors"] + [m['name'] for m in self.monitors], 
+                                    width=15, state="readonly")
+        monitor_combo.grid(row=1, column=1, padx=5, pady=(0,5))
+        monitor_combo.bind('<<ComboboxSelected>>', lambda e: self.update_scale_entry())
+        
+        ttk.Label(scale_frame, text="Scale (pixels/unit):").grid(row=2, column=0, padx=5)
         self.scale_entry = ttk.Entry(scale_frame, width=15)
         self.scale_entry.insert(0, "100")
-        self.scale_entry.grid(row=1, column=1, padx=5)
+        self.scale_entry.grid(row=2, column=1, padx=5)
         
         ttk.Button(scale_frame, text="Set", 
-                  command=self.set_scale).grid(row=1, column=2, padx=10)
+                  command=self.set_scale).grid(row=2, column=2, padx=10)
+        
+        ttk.Label(scale_frame, text="Source:").grid(row=3, column=0, padx=5, pady=(5,0))
+        self.source_label = ttk.Label(scale_frame, text="Unknown", foreground="gray")
+        self.source_label.grid(row=3, column=1, columnspan=2, sticky=tk.W, padx=5, pady=(5,0))
+        
+        calibrate_frame = ttk.Frame(scale_frame)
+        calibrate_frame.grid(row=4, column=0, columnspan=3, pady=(5,0))
+        
+        ttk.Button(calibrate_frame, text="Calibrate", 
+                  command=self.start_calibration).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(calibrate_frame, text="Detect Scale Bar", 
+                  command=self.detect_screen_scale_bar).pack(side=tk.LEFT, padx=5)
         
         # Line style settings
         style_frame = ttk.LabelFrame(main_frame, text="Line Style", padding="5")
@@ -86,6 +159,32 @@ class PersistentVisualRuler:
         width_combo.grid(row=0, column=3, padx=5)
         width_combo.bind('<<ComboboxSelected>>', self.change_line_width)
         
+        # Grid and ruler overlay settings
+        grid_frame = ttk.LabelFrame(main_frame, text="Grid and Rulers", padding="5")
+        grid_frame.pack(fill=tk.X, pady=5)
+        
+        self.rulers_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(grid_frame, text="Rulers", variable=self.rulers_var, 
+                       command=self.refresh_overlays).grid(row=0, column=0, padx=5)
+        
+        self.grid_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(grid_frame, text="Grid", variable=self.grid_var, 
+                       command=self.refresh_overlays).grid(row=0, column=1, padx=5)
+        
+        ttk.Label(grid_frame, text="Spacing (units):").grid(row=0, column=2, padx=5)
+        self.spacing_entry = ttk.Entry(grid_frame, width=6)
+        self.spacing_entry.insert(0, "1")
+        self.spacing_entry.grid(row=0, column=3, padx=5)
+        self.spacing_entry.bind('<Return>', self.change_grid)
+        self.spacing_entry.bind('<FocusOut>', self.change_grid)
+        
+        self.grid_color_var = tk.StringVar(value="white")
+        grid_color_combo = ttk.Combobox(grid_frame, textvariable=self.grid_color_var, 
+                                       values=["red", "blue", "green", "yellow", "white", "black"], 
+                                       width=8, state="readonly")
+        grid_color_combo.grid(row=0, column=4, padx=5)
+        grid_color_combo.bind('<<ComboboxSelected>>', self.change_grid)
+        
         # Button area
         btn_frame = ttk.Frame(main_frame)
         btn_frame.pack(pady=15)
@@ -104,6 +203,22 @@ class PersistentVisualRuler:
         ttk.Button(btn_frame, text="Exit", 
                   command=self.root.quit).pack(side=tk.LEFT, padx=10)
         
+        # Image tools
+        tool_frame = ttk.Frame(main_frame)
+        tool_frame.pack()
+        
+        ttk.Button(tool_frame, text="Open Image", 
+                  command=self.open_image).pack(side=tk.LEFT, padx=10)
+        
+        ttk.Button(tool_frame, text="Scroll Capture", 
+                  command=self.start_scroll_capture).pack(side=tk.LEFT, padx=10)
+        
+        ttk.Button(tool_frame, text="Select Region", 
+                  command=self.start_region_selection).pack(side=tk.LEFT, padx=10)
+        
+        ttk.Button(tool_frame, text="Clear Region", 
+                  command=self.clear_region).pack(side=tk.LEFT, padx=10)
+        
         # Status display
         self.status_label = ttk.Label(main_frame, text="Status: Ready", 
                                      foreground="green", font=("Arial", 10))
@@ -130,7 +245,11 @@ class PersistentVisualRuler:
 3. Press and hold left mouse button to drag and measure on screen
 4. Measurement line will be shown during dragging, release left button to complete
 5. All measurement lines will remain visible until ESC is pressed
-6. Press ESC to exit measurement mode and clear all lines"""
+6. Press ESC to exit measurement mode and clear all lines
+7. For drawings taller than the screen, use "Scroll Capture" and measure on the stitched image
+8. "Calibrate" sets the scale from a reference of known length, it is remembered per document
+9. With several monitors, pick one under "Monitor" to give it its own scale
+10. "Rulers" and "Grid" draw scaled rulers and a grid while measuring"""
         
         help_label = ttk.Label(main_frame, text=help_text, 
                               justify=tk.LEFT, font=("Arial", 9))
@@ -141,18 +260,235 @@ class PersistentVisualRuler:
         
     def set_scale(self):
         try:
-            self.scale_factor = float(self.scale_entry.get())
-            if self.scale_factor <= 0:
+            scale_factor = float(self.scale_entry.get())
+            if not (math.isfinite(scale_factor) and scale_factor > 0):
                 raise ValueError
-            messagebox.showinfo("Success", f"Scale set to: {self.scale_factor} pixels/unit")
+            self.use_scale(scale_factor, self.source, self.selected_monitor())
+            messagebox.showinfo("Success", f"Scale set to: {scale_factor} pixels/unit")
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid positive number")
             
+    def update_scale_entry(self):
+        """Show the scale of the selected monitor in the scale entry"""
+        self.scale_entry.delete(0, tk.END)
+        self.scale_entry.insert(0, f"{self.scale_for(self.selected_monitor()):g}")
+        
+    def selected_monitor(self):
+        for monitor in self.monitors:
+            if monitor['name'] == self.monitor_var.get():
+                return monitor
+        return None
+    
+    def scale_for(self, monitor):
+        """Scale of a monitor, the global scale unless it has its own"""
+        if monitor is None:
+            return self.scale_factor
+        return self.monitor_scales.get(monitor['name'], self.scale_factor)
+    
+    def scale_at(self, x, y):
+        """Scale at a screen position"""
+        if not self.monitor_scales:
+            return self.scale_factor
+        return self.scale_for(self.monitor_at(x, y))
+    
+    def monitor_at(self, x, y):
+        """Monitor containing a screen position, the first one if none does"""
+        for monitor in self.monitors:
+            if (monitor['x'] <= x < monitor['x'] + monitor['width'] and
+                    monitor['y'] <= y < monitor['y'] + monitor['height']):
+                return monitor
+        return self.monitors[0]
+    
+    def capture_bbox(self):
+        """Screen area for frame grabs: the region, else the selected or pointer's monitor"""
+        if self.region:
+            return self.region
+        monitor = self.selected_monitor() or self.monitor_at(*self.root.winfo_pointerxy())
+        return monitor_bbox(monitor)
+        
+    def load_scale_cache(self):
+        try:
+            with open(SCALE_CACHE_PATH, encoding='utf-8') as f:
+                cache = json.load(f)
+            # Drop unusable scales written by older versions
+            return {key: entry for key, entry in cache.items()
+                    if math.isfinite(entry['scale']) and entry['scale'] > 0}
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return {}
+        
+    def remember_scale(self, source, monitor=None):
+        """Cache the current scale for a source so it never needs re-entering"""
+        if not source:
+            return
+        key = source[0] if monitor is None else f"{source[0]}@{monitor['name']}"
+        self.scale_cache[key] = {'scale': self.scale_for(monitor), 'label': source[1]}
+        try:
+            with open(SCALE_CACHE_PATH, 'w', encoding='utf-8') as f:
+                json.dump(self.scale_cache, f, indent=1)
+        except OSError as e:
+            messagebox.showerror("Error", f"Cannot save scale cache: {e}")
+            
+    def set_source(self, source):
+        """Switch to a document source and load its cached scale"""
+        if source == self.source:
+            return
+        self.source = source
+        self.source_label.config(text=source[1] if source else "Unknown")
+        if not source:
+            return
+        
+        # The source's own scale and any per-monitor scales cached for it,
+        # monitor scales of the previous source do not carry over
+        changed = bool(self.monitor_scales)
+        self.monitor_scales = {}
+        loaded = False
+        cached = self.scale_cache.get(source[0])
+        if cached:
+            self.scale_factor = cached['scale']
+            loaded = True
+        for monitor in self.monitors:
+            cached = self.scale_cache.get(f"{source[0]}@{monitor['name']}")
+            if cached:
+                self.monitor_scales[monitor['name']] = cached['scale']
+                loaded = True
+        if loaded or changed:
+            self.update_scale_entry()
+            self.refresh_overlays()
+        if loaded:
+            self.status_label.config(text=f"Status: Scale loaded for {source[1]}", 
+                                     foreground="green")
+            
+    def poll_active_window(self):
+        """Track the foreground window of other programs as the current source"""
+        try:
+            title = pyautogui.getActiveWindowTitle()
+        except (AttributeError, NotImplementedError, pyautogui.PyAutoGUIException):
+            return  # Window titles are not available on this platform
+        
+        # Skip our own windows, native dialogs included, measuring over them
+        # keeps the previous source; without a process id fall back to titles
+        owner = foreground_window_pid()
+        if owner is not None:
+            own = owner == os.getpid()
+        else:
+            own_titles = {self.root.title()}
+            own_titles.update(w.title() for w in self.root.winfo_children() if isinstance(w, tk.Toplevel))
+            own = title in own_titles
+        if title and not own and title != self.last_window_title:
+            self.last_window_title = title
+            self.set_source(("window:" + title, title))
+        self.root.after(500, self.poll_active_window)
+        
+    def use_scale(self, scale_factor, source, monitor=None):
+        """Set the scale of a monitor, or the global one, and cache it for the source"""
+        if monitor:
+            self.monitor_scales[monitor['name']] = scale_factor
+        else:
+            self.scale_factor = scale_factor
+        self.update_scale_entry()
+        self.remember_scale(source, monitor)
+        self.refresh_overlays()
+        
+    def apply_scale(self, scale_factor, source, monitor=None):
+        """Use a calibrated scale and cache it for the source"""
+        # Show the calibrated monitor's scale, not an unchanged global one
+        if monitor:
+            self.monitor_var.set(monitor['name'])
+        self.use_scale(scale_factor, source, monitor)
+        self.status_label.config(text=f"Status: Scale calibrated to {scale_factor:.2f} pixels/unit", 
+                                 foreground="green")
+        
+    def calibrate_from_distance(self, distance, source, parent, monitor=None):
+        """Ask the real length of a reference and derive the scale from it"""
+        if distance <= 0:
+            return
+        length = simpledialog.askfloat("Calibrate", 
+                                       f"Reference length: {distance:.1f} pixels\nEnter its actual length:", 
+                                       parent=parent)
+        if length is None:
+            return  # Cancelled
+        scale_factor = distance / length if length > 0 else 0.0
+        if not (math.isfinite(scale_factor) and scale_factor > 0):
+            messagebox.showerror("Error", "Please enter a valid positive number", parent=parent)
+            return
+        self.apply_scale(scale_factor, source, monitor)
+            
+    def start_calibration(self):
+        """Measure a reference of known length on screen to set the scale"""
+        if not self.is_measuring:
+            self.start_measurement()
+        self.calibrating = True
+        x, y = self.root.winfo_pointerxy()
+        self.update_overlay("Drag across a reference of known length", x, y)
+        
+    def detect_screen_scale_bar(self):
+        """Find a scale bar on screen once the main window is out of the way"""
+        bbox = self.capture_bbox()
+        self.root.iconify()
+        self.root.after(300, self._detect_screen_scale_bar, bbox)
+        
+    def _detect_screen_scale_bar(self, bbox):
+        try:
+            frame = grab_region(bbox)
+        except OSError as e:
+            self.root.deiconify()
+            messagebox.showerror("Error", f"Screen capture failed: {e}")
+            return
+        self.root.deiconify()
+        bar = detect_scale_bar(frame)
+        if bar is None:
+            messagebox.showinfo("Detect Scale Bar", "No scale bar found")
+            return
+        x, y = bar[0] + bbox[0], bar[1] + bbox[1]
+        self.status_label.config(text=f"Status: Scale bar found at ({x}, {y})", foreground="green")
+        monitor = self.monitor_at(x, y) if len(self.monitors) > 1 else None
+        self.calibrate_from_distance(bar[2], self.source, self.root, monitor)
+            
     def change_line_color(self, event=None):
         self.line_color = self.color_var.get()
         
     def change_line_width(self, event=None):
         self.line_width = int(self.width_var.get())
+        
+    def change_grid(self, event=None):
+        try:
+            spacing = float(self.spacing_entry.get())
+            if not (math.isfinite(spacing) and spacing > 0):
+                raise ValueError
+        except ValueError:
+            self.spacing_entry.delete(0, tk.END)
+            self.spacing_entry.insert(0, f"{self.grid_spacing:g}")
+            return
+        self.grid_spacing = spacing
+        self.grid_color = self.grid_color_var.get()
+        self.refresh_overlays()
+        
+    def overlay_image(self, monitor):
+        """Grid/ruler overlay for a monitor, re-rendered only when an input changes"""
+        key = (self.scale_for(monitor), self.grid_spacing, self.grid_color, 
+               monitor['width'], monitor['height'], self.rulers_var.get(), self.grid_var.get())
+        photo = self.overlay_cache.get(key)
+        if photo is None:
+            # Each image is a full monitor of RGBA, keep only a few
+            if len(self.overlay_cache) >= 4:
+                self.overlay_cache.clear()
+            photo = ImageTk.PhotoImage(render_overlay(monitor['width'], monitor['height'], *key[:3], *key[5:]))
+            self.overlay_cache[key] = photo
+        return photo
+    
+    def draw_overlay(self, canvas):
+        """Show the overlay as a single image item below the measurement lines"""
+        canvas.delete('overlay')
+        if not (self.rulers_var.get() or self.grid_var.get()):
+            return
+        # Keep the shown photo alive even if the cache is cleared
+        canvas.overlay_photo = self.overlay_image(canvas.monitor)
+        canvas.create_image(0, 0, image=canvas.overlay_photo, anchor=tk.NW, tags='overlay')
+        canvas.tag_lower('overlay')
+        
+    def refresh_overlays(self):
+        for capture_window in self.capture_windows:
+            self.draw_overlay(capture_window.canvas)
             
     def toggle_measurement(self):
         if not self.is_measuring:
@@ -169,8 +505,8 @@ class PersistentVisualRuler:
         self.start_btn.config(text="Stop Measurement")
         self.status_label.config(text="Status: Measuring... Hold left button to drag and measure", foreground="red")
         
-        # Create fullscreen transparent window to capture mouse events
-        self.create_capture_window()
+        # Create fullscreen transparent windows to capture mouse events
+        self.create_capture_windows()
         
         # Create real-time display window
         self.create_overlay_window()
@@ -178,28 +514,53 @@ class PersistentVisualRuler:
         # Minimize main window
         self.root.iconify()
         
-    def create_capture_window(self):
-        """Create fullscreen transparent window to capture mouse events"""
-        self.capture_window = tk.Toplevel(self.root)
-        self.capture_window.attributes('-fullscreen', True)
-        self.capture_window.attributes('-alpha', 0.3)  # Almost transparent
-        self.capture_window.attributes('-topmost', True)
-        self.capture_window.configure(cursor="crosshair", bg='black')
-        
-        # Create canvas for drawing measurement lines
-        self.canvas = tk.Canvas(self.capture_window, highlightthickness=0)
-        self.canvas.pack(fill=tk.BOTH, expand=True)
-        self.canvas.configure(bg='black')
-        
-        # Bind events
-        self.canvas.bind('<Button-1>', self.on_mouse_down)
-        self.canvas.bind('<B1-Motion>', self.on_mouse_drag)
-        self.canvas.bind('<ButtonRelease-1>', self.on_mouse_up)
-        self.capture_window.bind('<Escape>', self.stop_measurement)
+    def create_capture_windows(self):
+        """Create a fullscreen transparent window per monitor to capture mouse events"""
+        if self.selecting_region:
+            handlers = (self.on_region_down, self.on_region_drag, self.on_region_up)
+        else:
+            handlers = (self.on_mouse_down, self.on_mouse_drag, self.on_mouse_up)
+        
+        for monitor in self.monitors:
+            # Fullscreen applies to the monitor the window is placed on
+            capture_window = tk.Toplevel(self.root)
+            capture_window.geometry(f"+{monitor['x']}+{monitor['y']}")
+            capture_window.attributes('-fullscreen', True)
+            capture_window.attributes('-alpha', 0.3)  # Almost transparent
+            capture_window.attributes('-topmost', True)
+            capture_window.configure(cursor="crosshair", bg='black')
+            
+            # Create canvas for drawing measurement lines
+            canvas = tk.Canvas(capture_window, highlightthickness=0)
+            canvas.pack(fill=tk.BOTH, expand=True)
+            canvas.configure(bg='black')
+            canvas.monitor = monitor
+            capture_window.canvas = canvas
+            
+            # Bind events
+            canvas.bind('<Button-1>', handlers[0])
+            canvas.bind('<B1-Motion>', handlers[1])
+            canvas.bind('<ButtonRelease-1>', handlers[2])
+            capture_window.bind('<Escape>', self.stop_measurement)
+            self.capture_windows.append(capture_window)
+            self.draw_overlay(canvas)
+        
+        if self.capture_windows:
+            self.capture_windows[0].focus_force()
         
         # Initialize temporary line ID
         self.temp_line_id = None
         
+    def to_canvas(self, point):
+        """Screen position to coordinates on the current monitor's canvas"""
+        return (point[0] - self.monitor['x'], point[1] - self.monitor['y'])
+    
+    def clamp_to_monitor(self, event):
+        """Event position clamped to the current monitor, drags do not cross monitors"""
+        monitor = self.monitor
+        return (min(max(event.x_root, monitor['x']), monitor['x'] + monitor['width'] - 1),
+                min(max(event.y_root, monitor['y']), monitor['y'] + monitor['height'] - 1))
+        
     def create_overlay_window(self):
         """Create real-time display small window"""
         self.overlay_window = tk.Toplevel(self.root)
@@ -222,6 +583,8 @@ class PersistentVisualRuler:
     def on_mouse_down(self, event):
         """Mouse button down event"""
         if self.is_measuring:
+            self.canvas = event.widget
+            self.monitor = self.canvas.monitor
             self.start_point = (event.x_root, event.y_root)
             self.dragging = True
             self.update_overlay("Start measuring...", event.x_root, event.y_root)
@@ -229,7 +592,7 @@ class PersistentVisualRuler:
     def on_mouse_drag(self, event):
         """Mouse drag event"""
         if self.is_measuring and self.dragging and self.start_point:
-            current_point = (event.x_root, event.y_root)
+            current_point = self.clamp_to_monitor(event)
             
             # Clear previous temporary line
             if self.temp_line_id:
@@ -237,8 +600,8 @@ class PersistentVisualRuler:
             
             # Draw new temporary line
             self.temp_line_id = self.canvas.create_line(
-                self.start_point[0], self.start_point[1],
-                current_point[0], current_point[1],
+                *self.to_canvas(self.start_point),
+                *self.to_canvas(current_point),
                 fill=self.line_color, width=self.line_width
             )
             
@@ -247,7 +610,7 @@ class PersistentVisualRuler:
                 (current_point[0] - self.start_point[0])**2 + 
                 (current_point[1] - self.start_point[1])**2
             )
-            real_distance = distance / self.scale_factor
+            real_distance = distance / self.scale_for(self.monitor)
             
             # Update real-time display
             display_text = f"Pixels: {distance:.1f}\nActual: {real_distance:.2f}"
@@ -256,14 +619,22 @@ class PersistentVisualRuler:
     def on_mouse_up(self, event):
         """Mouse button release event"""
         if self.is_measuring and self.dragging and self.start_point:
-            end_point = (event.x_root, event.y_root)
+            end_point = self.clamp_to_monitor(event)
             
             # Calculate final distance
             distance = math.sqrt(
                 (end_point[0] - self.start_point[0])**2 + 
                 (end_point[1] - self.start_point[1])**2
             )
-            real_distance = distance / self.scale_factor
+            real_distance = distance / self.scale_for(self.monitor)
+            
+            # A calibration drag sets the scale instead of recording a result
+            if self.calibrating:
+                monitor = self.monitor if len(self.monitors) > 1 else None
+                self.stop_measurement()
+                self.start_point = None
+                self.calibrate_from_distance(distance, self.source, self.root, monitor)
+                return
             
             # Convert temporary line to permanent line
             if self.temp_line_id:
@@ -272,13 +643,14 @@ class PersistentVisualRuler:
                 
                 # Create permanent line
                 permanent_line_id = self.canvas.create_line(
-                    self.start_point[0], self.start_point[1],
-                    end_point[0], end_point[1],
+                    *self.to_canvas(self.start_point),
+                    *self.to_canvas(end_point),
                     fill=self.line_color, width=self.line_width
                 )
                 
                 # Store line information
                 self.measurement_lines.append({
+                    'canvas': self.canvas,
                     'line_id': permanent_line_id,
                     'start_point': self.start_point,
                     'end_point': end_point,
@@ -297,6 +669,54 @@ class PersistentVisualRuler:
         self.dragging = False
         self.start_point = None
         
+    def start_region_selection(self):
+        """Drag a rectangle to limit frame grabs to a region of interest"""
+        if self.is_measuring:
+            self.stop_measurement()
+        self.selecting_region = True
+        self.create_capture_windows()
+        self.create_overlay_window()
+        x, y = self.root.winfo_pointerxy()
+        self.update_overlay("Drag to select the capture region", x, y)
+        self.root.iconify()
+        
+    def on_region_down(self, event):
+        self.canvas = event.widget
+        self.monitor = self.canvas.monitor
+        self.start_point = (event.x_root, event.y_root)
+        
+    def on_region_drag(self, event):
+        if not self.start_point:
+            return
+        current_point = self.clamp_to_monitor(event)
+        if self.temp_line_id:
+            self.canvas.delete(self.temp_line_id)
+        self.temp_line_id = self.canvas.create_rectangle(
+            *self.to_canvas(self.start_point),
+            *self.to_canvas(current_point),
+            outline=self.line_color, width=self.line_width
+        )
+        width = abs(current_point[0] - self.start_point[0])
+        height = abs(current_point[1] - self.start_point[1])
+        self.update_overlay(f"{width} x {height}", event.x_root, event.y_root)
+        
+    def on_region_up(self, event):
+        if not self.start_point:
+            return
+        end_point = self.clamp_to_monitor(event)
+        left, right = sorted((self.start_point[0], end_point[0]))
+        top, bottom = sorted((self.start_point[1], end_point[1]))
+        self.stop_measurement()
+        self.start_point = None
+        if right - left >= 10 and bottom - top >= 10:
+            self.region = (left, top, right + 1, bottom + 1)
+            self.status_label.config(text=f"Status: Region {right - left + 1} x {bottom - top + 1} at ({left}, {top})", 
+                                     foreground="green")
+            
+    def clear_region(self):
+        self.region = None
+        self.status_label.config(text="Status: Grabs cover the whole monitor", foreground="green")
+        
     def update_overlay(self, text, x, y):
         """Update real-time display window position and content"""
         if self.overlay_window and self.overlay_label:
@@ -306,6 +726,8 @@ class PersistentVisualRuler:
             
     def stop_measurement(self, event=None):
         self.is_measuring = False
+        self.calibrating = False
+        self.selecting_region = False
         self.dragging = False
         self.start_btn.config(text="Start Drag Measurement")
         self.status_label.config(text="Status: Ready", foreground="green")
@@ -313,10 +735,11 @@ class PersistentVisualRuler:
         # Clear all measurement lines
         self.clear_lines()
         
-        # Close capture window
-        if self.capture_window:
-            self.capture_window.destroy()
-            self.capture_window = None
+        # Close capture windows
+        for capture_window in self.capture_windows:
+            capture_window.destroy()
+        self.capture_windows = []
+        self.canvas = None
             
         # Close real-time display window
         if self.overlay_window:
@@ -328,6 +751,9 @@ class PersistentVisualRuler:
         self.root.lift()
         
     def clear_results(self):
+        with self.results_lock:
+            self.results = []
+        self.results_shown = False
         self.result_text.config(state=tk.NORMAL)
         self.result_text.delete(1.0, tk.END)
         self.result_text.insert(tk.END, "No measurement results yet\n")
@@ -335,42 +761,947 @@ class PersistentVisualRuler:
         
     def clear_lines(self):
         """Clear all measurement lines"""
-        if self.canvas:
-            # Clear temporary line
-            if self.temp_line_id:
-                self.canvas.delete(self.temp_line_id)
-                self.temp_line_id = None
-                
-            # Clear all permanent lines
-            for line_info in self.measurement_lines:
-                self.canvas.delete(line_info['line_id'])
+        # Clear temporary line
+        if self.canvas and self.temp_line_id:
+            self.canvas.delete(self.temp_line_id)
+            self.temp_line_id = None
             
-            # Clear line list
-            self.measurement_lines = []
+        # Clear all permanent lines
+        for line_info in self.measurement_lines:
+            line_info['canvas'].delete(line_info['line_id'])
+        
+        # Clear line list
+        self.measurement_lines = []
         
     def record_result(self, pixel_distance, real_distance, start_point, end_point):
-        """Record measurement result to text box"""
-        self.result_text.config(state=tk.NORMAL)
+        """Record measurement result to the session and text box"""
+        results = self.store_results([(start_point, end_point, pixel_distance, real_distance)])
+        self.show_results(results)
         
-        # Add separator (if not the first record)
-        if self.result_text.get(1.0, tk.END).strip() != "No measurement results yet":
-            self.result_text.insert(tk.END, "-" * 50 + "\n")
+    def store_results(self, measurements):
+        """Append (start, end, pixel, real) tuples to the session, thread safe"""
+        with self.results_lock:
+            index = len(self.results)
+            results = []
+            for start_point, end_point, pixel_distance, real_distance in measurements:
+                results.append({
+                    'index': index,
+                    'start_point': list(start_point),
+                    'end_point': list(end_point),
+                    'pixel_distance': pixel_distance,
+                    'real_distance': real_distance
+                })
+                index += 1
+            self.results.extend(results)
+        
+        # Stream new results to API subscribers
+        if self.rpc_server:
+            self.rpc_server.publish(results)
+        return results
+        
+    def show_results(self, results):
+        """Write stored results to the text box in one insert"""
+        self.result_text.config(state=tk.NORMAL)
         
-        # Insert new result
-        result_str = (f"Start: ({start_point[0]}, {start_point[1]})\n"
-                     f"End: ({end_point[0]}, {end_point[1]})\n"
-                     f"Pixel distance: {pixel_distance:.2f}\n"
-                     f"Actual length: {real_distance:.2f}\n\n")
+        # Insert new results, with a separator if not the first record
+        parts = []
+        for result in results:
+            if self.results_shown:
+                parts.append("-" * 50 + "\n")
+            self.results_shown = True
+            start_point, end_point = result['start_point'], result['end_point']
+            parts.append(f"Start: ({start_point[0]}, {start_point[1]})\n"
+                         f"End: ({end_point[0]}, {end_point[1]})\n"
+                         f"Pixel distance: {result['pixel_distance']:.2f}\n"
+                         f"Actual length: {result['real_distance']:.2f}\n\n")
         
-        self.result_text.insert(tk.END, result_str)
+        self.result_text.insert(tk.END, "".join(parts))
         self.result_text.see(tk.END)  # Scroll to end
         self.result_text.config(state=tk.DISABLED)
+        
+    def draw_results(self, results):
+        """Draw stored results as permanent lines while measuring"""
+        if not self.is_measuring:
+            return
+        for result in results:
+            start_point, end_point = result['start_point'], result['end_point']
+            monitor = self.monitor_at(*start_point)
+            canvas = self.capture_windows[self.monitors.index(monitor)].canvas
+            line_id = canvas.create_line(
+                start_point[0] - monitor['x'], start_point[1] - monitor['y'],
+                end_point[0] - monitor['x'], end_point[1] - monitor['y'],
+                fill=self.line_color, width=self.line_width
+            )
+            self.measurement_lines.append({
+                'canvas': canvas,
+                'line_id': line_id,
+                'start_point': tuple(start_point),
+                'end_point': tuple(end_point),
+                'pixel_distance': result['pixel_distance'],
+                'real_distance': result['real_distance']
+            })
+            
+    def open_image(self, path=None):
+        """Open an image file in a scrollable viewer window"""
+        if path is None:
+            path = filedialog.askopenfilename(
+                title="Open Image",
+                filetypes=[("Images", "*.png *.jpg *.jpeg *.bmp *.gif *.tif *.tiff"),
+                           ("All files", "*.*")])
+            if not path:
+                return None
+        
+        try:
+            image = Image.open(path)
+            image.load()
+            source = file_source(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Cannot open image: {e}")
+            return None
+        
+        self.show_image(image, os.path.basename(path), source)
+        
+    def show_image(self, image, title, source=None, monitor=None):
+        """Show a PIL image in a scrollable viewer window, measured at the scale of monitor"""
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        
+        # Canvas with scrollbars so images larger than the screen fit
+        canvas = tk.Canvas(window, highlightthickness=0,
+                           width=min(image.width, self.root.winfo_screenwidth() - 100),
+                           height=min(image.height, self.root.winfo_screenheight() - 150))
+        x_scroll = ttk.Scrollbar(window, orient=tk.HORIZONTAL, command=canvas.xview)
+        y_scroll = ttk.Scrollbar(window, orient=tk.VERTICAL, command=canvas.yview)
+        canvas.configure(xscrollcommand=x_scroll.set, yscrollcommand=y_scroll.set,
+                         scrollregion=(0, 0, image.width, image.height))
+        bar = ttk.Frame(window)
+        bar.pack(side=tk.BOTTOM, fill=tk.X)
+        canvas.info_label = ttk.Label(bar, text="Drag on the image to measure")
+        canvas.info_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(bar, text="Detect Scale Bar", 
+                  command=lambda: self.detect_image_scale_bar(canvas, image)).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(bar, text="Calibrate", 
+                  command=lambda: self.start_image_calibration(canvas)).pack(side=tk.RIGHT, padx=5)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        x_scroll.pack(side=tk.BOTTOM, fill=tk.X)
+        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Keep a reference to the photo, Tk does not
+        canvas.photo = ImageTk.PhotoImage(image)
+        canvas.create_image(0, 0, image=canvas.photo, anchor=tk.NW)
+        canvas.bind('<MouseWheel>', lambda e: canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        
+        # Measure in image coordinates, so lengths span the whole image
+        canvas.start_point = None
+        canvas.temp_line_id = None
+        canvas.calibrating = False
+        canvas.bind('<Button-1>', self.on_image_mouse_down)
+        canvas.bind('<B1-Motion>', self.on_image_mouse_drag)
+        canvas.bind('<ButtonRelease-1>', self.on_image_mouse_up)
+        
+        # The viewer's source and its cached scale apply while it has focus
+        canvas.source = source
+        canvas.monitor = monitor
+        window.bind('<FocusIn>', lambda e: self.set_source(canvas.source))
+        self.set_source(source)
+        
+        self.status_label.config(text=f"Status: Opened {title}", foreground="green")
+        
+    def start_image_calibration(self, canvas):
+        canvas.calibrating = True
+        canvas.info_label.config(text="Drag across a reference of known length")
+        
+    def detect_image_scale_bar(self, canvas, image):
+        """Find and outline a scale bar in a viewer image, then calibrate from it"""
+        bar = detect_scale_bar(image)
+        canvas.delete('scale_bar')
+        if bar is None:
+            canvas.info_label.config(text="No scale bar found")
+            return
+        x, y, length, thickness = bar
+        canvas.create_rectangle(x - 3, y - 3, x + length + 3, y + thickness + 3, 
+                                outline='magenta', width=2, tags='scale_bar')
+        canvas.yview_moveto(max(0.0, (y - canvas.winfo_height() / 2) / image.height))
+        self.calibrate_from_distance(length, canvas.source, canvas.winfo_toplevel(), canvas.monitor)
+        
+    def image_point(self, event):
+        """Convert a viewer event position to image coordinates"""
+        canvas = event.widget
+        return (int(canvas.canvasx(event.x)), int(canvas.canvasy(event.y)))
+        
+    def on_image_mouse_down(self, event):
+        """Mouse button down on an image viewer"""
+        event.widget.start_point = self.image_point(event)
+        
+    def on_image_mouse_drag(self, event):
+        """Mouse drag on an image viewer"""
+        canvas = event.widget
+        if not canvas.start_point:
+            return
+        
+        # Scroll when dragging past the edge to reach the rest of the image
+        if event.y < 0 or event.y > canvas.winfo_height():
+            canvas.yview_scroll(-1 if event.y < 0 else 1, "units")
+        if event.x < 0 or event.x > canvas.winfo_width():
+            canvas.xview_scroll(-1 if event.x < 0 else 1, "units")
+        
+        current_point = self.image_point(event)
+        if canvas.temp_line_id:
+            canvas.delete(canvas.temp_line_id)
+        canvas.temp_line_id = canvas.create_line(
+            canvas.start_point[0], canvas.start_point[1],
+            current_point[0], current_point[1],
+            fill=self.line_color, width=self.line_width
+        )
+        
+        distance = math.hypot(current_point[0] - canvas.start_point[0],
+                              current_point[1] - canvas.start_point[1])
+        canvas.info_label.config(text=f"Pixels: {distance:.1f}    "
+                                      f"Actual: {distance / self.scale_for(canvas.monitor):.2f}")
+        
+    def on_image_mouse_up(self, event):
+        """Mouse button release on an image viewer, lines stay until the viewer closes"""
+        canvas = event.widget
+        if canvas.start_point and canvas.temp_line_id:
+            end_point = self.image_point(event)
+            distance = math.hypot(end_point[0] - canvas.start_point[0],
+                                  end_point[1] - canvas.start_point[1])
+            real_distance = distance / self.scale_for(canvas.monitor)
+            if canvas.calibrating:
+                canvas.calibrating = False
+                canvas.delete(canvas.temp_line_id)
+                canvas.start_point = None
+                canvas.temp_line_id = None
+                canvas.info_label.config(text="Drag on the image to measure")
+                self.calibrate_from_distance(distance, canvas.source, canvas.winfo_toplevel(), 
+                                             canvas.monitor)
+                return
+            canvas.coords(canvas.temp_line_id, *canvas.start_point, *end_point)
+            self.record_result(distance, real_distance, canvas.start_point, end_point)
+            canvas.info_label.config(text=f"Actual: {real_distance:.2f}")
+        canvas.start_point = None
+        canvas.temp_line_id = None
+        
+    def start_scroll_capture(self):
+        """Stitch a document scrolled under the screen into one measurable image"""
+        if self.is_measuring:
+            self.stop_measurement()
+        left, top, right, bottom = self.capture_bbox()
+        monitor = self.monitor_at(left, top)
+        self.root.iconify()
+        
+        # Thin control bar across the top of the monitor, frames are grabbed below it
+        self.scroll_window = tk.Toplevel(self.root)
+        self.scroll_window.overrideredirect(True)
+        self.scroll_window.attributes('-topmost', True)
+        self.scroll_window.configure(bg='lightyellow')
+        self.scroll_window.geometry(f"{monitor['width']}x32+{monitor['x']}+{monitor['y']}")
+        self.scroll_label = tk.Label(self.scroll_window, 
+                                     text="Scroll the document slowly, then click Finish", 
+                                     bg='lightyellow', fg='black',
+                                     font=("Arial", 10, "bold"))
+        self.scroll_label.pack(side=tk.LEFT, padx=10)
+        ttk.Button(self.scroll_window, text="Finish", 
+                  command=self.finish_scroll_capture).pack(side=tk.RIGHT, padx=10)
+        
+        top = max(top, monitor['y'] + 32)
+        self.scroll_capture = ScrollCapture(bbox=(left, top, right, bottom))
+        self.scroll_source = self.source
+        self.scroll_monitor = monitor if len(self.monitors) > 1 else None
+        self.scroll_stop = threading.Event()
+        self.scroll_thread = threading.Thread(target=self.scroll_capture_worker, daemon=True)
+        self.scroll_thread.start()
+        self.root.after(200, self.update_scroll_status)
+        
+    def scroll_capture_worker(self):
+        """Grab and stitch frames until stopped, runs in a background thread"""
+        capture, stop = self.scroll_capture, self.scroll_stop
+        while not stop.is_set():
+            started = time.time()
+            try:
+                capture.grab()
+            except OSError as e:
+                capture.error = e
+                return
+            stop.wait(max(0.0, 0.1 - (time.time() - started)))
+            
+    def update_scroll_status(self):
+        """Show scroll capture progress in the control bar"""
+        if not self.scroll_window:
+            return
+        capture = self.scroll_capture
+        if capture.lost:
+            self.scroll_label.config(text="Registration lost, scroll back to the last captured part", 
+                                     fg='red')
+        else:
+            self.scroll_label.config(text=f"Scroll the document slowly, then click Finish    "
+                                          f"Frames: {capture.frames}    Height: {capture.bottom - capture.top}px",
+                                     fg='black')
+        self.root.after(200, self.update_scroll_status)
+        
+    def finish_scroll_capture(self):
+        self.scroll_stop.set()
+        self.scroll_thread.join()
+        self.scroll_window.destroy()
+        self.scroll_window = None
+        self.root.deiconify()
+        
+        capture, self.scroll_capture = self.scroll_capture, None
+        if capture.error:
+            messagebox.showerror("Error", f"Screen capture failed: {capture.error}")
+            return
+        image = capture.stitched_image()
+        if image is None:
+            messagebox.showinfo("Scroll Capture", "No scrolling was detected")
+            return
+        self.show_image(image, "Scroll Capture", self.scroll_source, self.scroll_monitor)
+
+def get_monitors(root):
+    """Monitors as dicts of name, x, y, width and height in desktop coordinates"""
+    if mss is not None:
+        with mss.mss() as sct:
+            return [{'name': f"Monitor {i}", 'x': m['left'], 'y': m['top'],
+                     'width': m['width'], 'height': m['height']}
+                    for i, m in enumerate(sct.monitors[1:], 1)]
+    # Without mss Tk only knows the primary screen
+    return [{'name': "Monitor 1", 'x': 0, 'y': 0,
+             'width': root.winfo_screenwidth(), 'height': root.winfo_screenheight()}]
+
+def foreground_window_pid():
+    """Process id of the foreground window, None where it cannot be told"""
+    if sys.platform != 'win32':
+        return None
+    user32 = ctypes.windll.user32
+    pid = ctypes.c_ulong()
+    user32.GetWindowThreadProcessId(user32.GetForegroundWindow(), ctypes.byref(pid))
+    return pid.value
+
+def monitor_bbox(monitor):
+    return (monitor['x'], monitor['y'],
+            monitor['x'] + monitor['width'], monitor['y'] + monitor['height'])
+
+_grabbers = threading.local()
+
+def grab_region(bbox):
+    """Grab a (left, top, right, bottom) screen region as an RGB image
+    
+    mss copies only the region, so cost follows its size; ImageGrab grabs the
+    whole desktop and crops on some platforms.
+    """
+    if mss is None:
+        return ImageGrab.grab(bbox=bbox, all_screens=True)
+    
+    # mss handles are per thread
+    sct = getattr(_grabbers, 'sct', None)
+    if sct is None:
+        sct = _grabbers.sct = mss.mss()
+    left, top, right, bottom = bbox
+    try:
+        shot = sct.grab({'left': left, 'top': top, 'width': right - left, 'height': bottom - top})
+    except mss.ScreenShotError as e:
+        raise OSError(str(e))
+    return Image.frombytes('RGB', shot.size, shot.bgra, 'raw', 'BGRX')
+
+def render_overlay(width, height, scale_factor, spacing, color, rulers, grid):
+    """Render edge rulers and a grid every `spacing` units into one RGBA image
+    
+    Lines are set with NumPy slicing rather than drawn one by one, so the cost
+    does not grow with grid density; only the ruler labels use ImageDraw.
+    """
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    rgba = ImageColor.getrgb(color)[:3] + (255,)
+    step = spacing * scale_factor  # Pixels between major lines
+    
+    if grid and step >= 4:
+        pixels[:, np.arange(0, width, step).astype(int)] = rgba
+        pixels[np.arange(0, height, step).astype(int), :] = rgba
+        
+    if rulers:
+        # Tenths, halves and whole spacings, skipping divisions that would crowd
+        for divisions, length in ((10, 6), (2, 10), (1, 16)):
+            tick = step / divisions
+            if tick < 4:
+                continue
+            pixels[:length, np.arange(0, width, tick).astype(int)] = rgba
+            pixels[np.arange(0, height, tick).astype(int), :length] = rgba
+            
+    image = Image.fromarray(pixels, 'RGBA')
+    if rulers and step >= 4:
+        # Label every major tick that leaves room for the text
+        every = max(1, math.ceil(40 / step))
+        draw = ImageDraw.Draw(image)
+        for i in range(every, int(width / step) + 1, every):
+            draw.text((int(i * step) + 2, 16), f"{i * spacing:g}", fill=rgba)
+        for i in range(every, int(height / step) + 1, every):
+            draw.text((18, int(i * step) + 2), f"{i * spacing:g}", fill=rgba)
+    return image
+
+def file_source(path):
+    """Source (key, label) of an image file, keyed by its content hash"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return ("file:" + digest.hexdigest(), os.path.basename(path))
+
+def detect_scale_bar(image, dark_level=100, min_length=20, min_thickness=3, max_thickness=20):
+    """Find the longest thick horizontal dark bar as (x, y, length, thickness), or None
+    
+    Dark pixel runs are found per row by run-length analysis; a bar is a stack
+    of identical runs on consecutive rows, thicker than a table rule but still
+    thin. Runs reaching the left or right edge are window chrome such as title
+    bars and taskbars, and bars with light rows above and below come first.
+    """
+    dark = np.asarray(image.convert('L')) < dark_level
+    height, width = dark.shape
+    edges = np.diff(np.pad(dark, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+    lengths = ends - starts
+    keep = (lengths >= min_length) & (starts > 0) & (ends < width)
+    rows, starts, lengths = rows[keep], starts[keep], lengths[keep]
+    if len(rows) == 0:
+        return None
+    
+    # Group identical runs on consecutive rows
+    order = np.lexsort((rows, lengths, starts))
+    rows, starts, lengths = rows[order], starts[order], lengths[order]
+    new_group = np.ones(len(rows), dtype=bool)
+    new_group[1:] = (starts[1:] != starts[:-1]) | (lengths[1:] != lengths[:-1]) | (rows[1:] != rows[:-1] + 1)
+    group_starts = np.flatnonzero(new_group)
+    thickness = np.diff(np.append(group_starts, len(rows)))
+    bar_lengths = lengths[group_starts]
+    
+    candidates = np.flatnonzero((thickness >= min_thickness) & (thickness <= max_thickness) & 
+                                (thickness * 4 <= bar_lengths))
+    if len(candidates) == 0:
+        return None
+    
+    # Dark pixels in the rows just above and below each bar, rows outside the
+    # image count as light
+    dark_count = np.pad(np.cumsum(dark, axis=1), ((1, 1), (1, 0)))
+    x = starts[group_starts[candidates]]
+    length = bar_lengths[candidates]
+    above = rows[group_starts[candidates]]  # Padded index of the row above
+    below = above + thickness[candidates] + 1
+    isolated = ((dark_count[above, x + length] - dark_count[above, x] < length // 4) & 
+                (dark_count[below, x + length] - dark_count[below, x] < length // 4))
+    
+    # Isolated bars first, then the longest
+    best = candidates[np.lexsort((length, isolated))[-1]]
+    first = group_starts[best]
+    return (int(starts[first]), int(rows[first]), int(bar_lengths[best]), int(thickness[best]))
+
+def row_correlation(reference, frame, min_overlap):
+    """Return (dy, score) so that frame[y] ~ reference[y + dy], score in [-1, 1]
+    
+    Normalized cross correlation of just the overlapping rows, for every
+    vertical shift at once through FFTs along the columns. Unlike circular
+    phase correlation it finds shifts up to the height less min_overlap, and
+    a blank overlap never matches.
+    """
+    reference = reference.astype(np.float64)
+    frame = frame.astype(np.float64)
+    height, width = reference.shape
+    size = 2 * height
+    # products[dy] = sum of reference[y + dy] * frame[y], negative dy wrap around
+    spectrum = np.fft.rfft(reference, n=size, axis=0) * np.conj(np.fft.rfft(frame, n=size, axis=0))
+    products = np.fft.irfft(spectrum.sum(axis=1), n=size)
+    
+    # Sums over the overlapping rows from cumulative row sums
+    def overlap_sums(rows, lo, hi):
+        cumulative = np.concatenate(([0.0], np.cumsum(rows)))
+        return cumulative[hi] - cumulative[lo]
+    
+    shifts = np.arange(min_overlap - height, height - min_overlap + 1)
+    ref_lo, ref_hi = np.maximum(shifts, 0), height + np.minimum(shifts, 0)
+    frame_lo, frame_hi = np.maximum(-shifts, 0), height - np.maximum(shifts, 0)
+    count = (height - np.abs(shifts)) * width
+    sum_ref = overlap_sums(reference.sum(axis=1), ref_lo, ref_hi)
+    sum_frame = overlap_sums(frame.sum(axis=1), frame_lo, frame_hi)
+    var_ref = overlap_sums((reference ** 2).sum(axis=1), ref_lo, ref_hi) - sum_ref ** 2 / count
+    var_frame = overlap_sums((frame ** 2).sum(axis=1), frame_lo, frame_hi) - sum_frame ** 2 / count
+    covariance = products[shifts % size] - sum_ref * sum_frame / count
+    
+    # Overlaps with next to no contrast carry no evidence
+    textured = (var_ref > count) & (var_frame > count)
+    score = np.full(len(shifts), -1.0)
+    score[textured] = covariance[textured] / np.sqrt(var_ref[textured] * var_frame[textured])
+    best = int(np.argmax(score))
+    return int(shifts[best]), float(score[best])
+
+class ScrollCapture:
+    """Stitch frames of a document scrolled under a screen region into one image.
+    
+    Each frame is registered against the last registered one by FFT row
+    correlation on a downsampled grayscale copy, then refined at full
+    resolution. Only the rows each frame reveals are kept, as strips placed
+    at stitched offsets. Frames that fail to register are skipped until the
+    document is scrolled back to overlap the last registered frame.
+    """
+    
+    REGISTER_SIZE = 384  # Longest side used for row correlation
+    MIN_CORRELATION = 0.7  # Weaker matches count as failed registration
+    MIN_OVERLAP = 32  # Rows two frames must share to be registered
+    CHANGE_LEVEL = 8  # Gray level difference that counts as a changed pixel
+    LOST_AFTER = 3  # Failed frames in a row before registration counts as lost
+    
+    def __init__(self, bbox):
+        self.bbox = bbox  # Screen region to grab
+        self.band = None  # (top, bottom) rows that scroll, found on first move
+        self.strips = []  # (stitched y, PIL image) pairs
+        self.first_frame = None
+        self.previous = None  # Grayscale of the last registered frame
+        self.position = 0  # Stitched y of the current frame's band top
+        self.top = 0
+        self.bottom = 0
+        self.frames = 0
+        self.failures = 0  # Frames in a row that failed to register
+        self.error = None
+        
+    @property
+    def lost(self):
+        return self.failures >= self.LOST_AFTER
+        
+    def grab(self):
+        """Grab the capture region and add it, returns True if it was stitched"""
+        return self.add_frame(grab_region(self.bbox))
+    
+    def add_frame(self, frame):
+        frame = frame.convert('RGB')
+        gray = np.asarray(frame.convert('L'), dtype=np.float32)
+        if self.previous is None:
+            self.first_frame = frame
+            self.previous = gray
+            return False
+        
+        # Only rows and columns that changed take part, which skips idle
+        # frames cheaply and keeps static toolbars out of the registration
+        changed = np.abs(gray - self.previous) > self.CHANGE_LEVEL
+        rows = np.flatnonzero(changed.any(axis=1))
+        columns = np.flatnonzero(changed.any(axis=0))
+        if len(rows) < 2:
+            return False
+        top, bottom = self.band or (int(rows[0]), int(rows[-1]) + 1)
+        shift = self.register(self.previous[top:bottom, columns[0]:columns[-1] + 1],
+                              gray[top:bottom, columns[0]:columns[-1] + 1])
+        if shift is None:
+            self.failures += 1
+            return False
+        self.failures = 0
+        if not shift:
+            return False
+        
+        if self.band is None:
+            top, bottom = self.band = self.scrolling_rows(gray, top, bottom, shift)
+            self.strips.append((0, self.first_frame.crop((0, top, frame.width, bottom))))
+            self.bottom = bottom - top
+            self.first_frame = None
+        
+        # Keep only the rows this frame reveals above or below the stitched area
+        height = bottom - top
+        self.position += shift
+        if self.position < self.top:
+            rows_new = self.top - self.position
+            self.strips.append((self.position, frame.crop((0, top, frame.width, top + rows_new))))
+            self.top = self.position
+        if self.position + height > self.bottom:
+            rows_new = self.position + height - self.bottom
+            self.strips.append((self.bottom, frame.crop((0, bottom - rows_new, frame.width, bottom))))
+            self.bottom = self.position + height
+        self.previous = gray
+        self.frames += 1
+        return True
+    
+    def scrolling_rows(self, gray, top, bottom, shift):
+        """Grow the changed rows (top, bottom) over unchanged rows that move with the content
+        
+        Blank rows look unchanged between two frames, but unlike a static
+        toolbar they also match the previous frame `shift` rows away.
+        """
+        height = len(gray)
+        
+        def moves(row):
+            # gray[y] shows what self.previous showed at y + shift
+            pairs = [(gray[y], self.previous[y + shift]) for y in (row, row - shift) 
+                     if 0 <= y < height and 0 <= y + shift < height]
+            return all(not (np.abs(a - b) > self.CHANGE_LEVEL).any() for a, b in pairs)
+        
+        while top > 0 and moves(top - 1):
+            top -= 1
+        while bottom < height and moves(bottom):
+            bottom += 1
+        return top, bottom
+    
+    def register(self, previous, current):
+        """Return how many rows the content moved up, None if registration failed"""
+        height, width = previous.shape
+        factor = -(-max(height, width) // self.REGISTER_SIZE)
+        if height < 8 * factor or width < 8 * factor or height <= self.MIN_OVERLAP:
+            return None
+        
+        # Coarse shift from block averaged copies
+        small_previous = np.asarray(Image.fromarray(previous).reduce(factor))
+        small_current = np.asarray(Image.fromarray(current).reduce(factor))
+        dy, score = row_correlation(small_previous, small_current, 
+                                    min(self.MIN_OVERLAP // factor, len(small_previous) - 1))
+        if score < self.MIN_CORRELATION:
+            return None
+        
+        # Refine to a single row by comparing overlaps at full resolution.
+        # Every row takes part, skipping rows lets content that changes in
+        # pairs of rows match one row off; ties go to the coarse estimate
+        best, best_error = None, None
+        for shift in sorted(range(dy * factor - factor, dy * factor + factor + 1),
+                            key=lambda shift: abs(shift - dy * factor)):
+            if abs(shift) > height - self.MIN_OVERLAP:
+                continue
+            if shift >= 0:
+                a, b = previous[shift:, ::4], current[:height - shift, ::4]
+            else:
+                a, b = previous[:height + shift, ::4], current[-shift:, ::4]
+            error = float(np.abs(a - b).mean())
+            if best_error is None or error < best_error:
+                best, best_error = shift, error
+        return best
+    
+    def stitched_image(self):
+        """Compose the strips into one image, None if nothing was stitched"""
+        if not self.strips:
+            return None
+        image = Image.new('RGB', (self.strips[0][1].width, self.bottom - self.top))
+        for y, strip in self.strips:
+            image.paste(strip, (0, y - self.top))
+        return image
+
+class MeasurementRPCServer:
+    """Local JSON-RPC 2.0 automation API on a Unix domain socket.
+    
+    Requests are newline delimited JSON objects or batch arrays. The server runs
+    its own asyncio loop in a background thread; anything that touches Tk is
+    queued and run by the Tk loop through root.after polling.
+    """
+    
+    POLL_MS = 15  # Tk queue polling interval
+    READ_LIMIT = 64 * 1024 * 1024  # Max request line, bulk calls can be large
+    HIGH_WATER = 1024 * 1024  # Drain or drop clients buffering more than this
+    
+    def __init__(self, app, path):
+        self.app = app
+        self.path = path
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.error = None
+        self.clients = set()
+        self.subscribers = set()
+        self.tk_queue = queue.Queue()
+        self.pending_results = []  # Added results not yet shown in Tk
+        self.pending_lock = threading.Lock()
+        self.methods = {
+            'get_scale': self.rpc_get_scale,
+            'set_scale': self.rpc_set_scale,
+            'open_image': self.rpc_open_image,
+            'measure': self.rpc_measure,
+            'add': self.rpc_add,
+            'get_results': self.rpc_get_results,
+            'clear_results': self.rpc_clear_results,
+            'subscribe': self.rpc_subscribe,
+            'unsubscribe': self.rpc_unsubscribe,
+        }
+        
+    def start(self):
+        """Start the asyncio thread and the Tk queue polling"""
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self.thread.start()
+        ready.wait()
+        if self.error:
+            raise self.error
+        self.app.rpc_server = self
+        self.app.root.after(self.POLL_MS, self._drain_tk_queue)
+        
+    def stop(self):
+        self.app.rpc_server = None
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=2)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+            
+    def _run(self, ready):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._remove_stale_socket()
+            self.server = self.loop.run_until_complete(asyncio.start_unix_server(
+                self.handle_client, path=self.path, limit=self.READ_LIMIT))
+        except (OSError, NotImplementedError, AttributeError) as e:
+            self.error = e
+            ready.set()
+            return
+        ready.set()
+        self.loop.run_forever()
+        
+        # Close client connections and let their handlers finish
+        self.server.close()
+        for writer in list(self.clients):
+            writer.close()
+        self.loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(self.loop),
+                                                    return_exceptions=True))
+        self.loop.close()
+        
+    def _remove_stale_socket(self):
+        """Remove a socket left by a previous run, never a live one or another file"""
+        try:
+            mode = os.stat(self.path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise FileExistsError(errno.EEXIST, "Path exists and is not a socket", self.path)
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(self.path)
+        except ConnectionRefusedError:
+            os.unlink(self.path)
+            return
+        finally:
+            probe.close()
+        raise OSError(errno.EADDRINUSE, "Another instance is serving on this socket", self.path)
+        
+    def _drain_tk_queue(self):
+        """Run queued Tk work in the Tk thread, all pending items per tick"""
+        while True:
+            try:
+                func, args, future = self.tk_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                result = func(*args)
+            except Exception as e:
+                if future:
+                    future.set_exception(e)
+            else:
+                if future:
+                    future.set_result(result)
+        if self.app.rpc_server is self:
+            self.app.root.after(self.POLL_MS, self._drain_tk_queue)
+            
+    def call_in_tk(self, func, *args):
+        """Queue func for the Tk thread and return an awaitable for its result"""
+        future = concurrent.futures.Future()
+        self.tk_queue.put((func, args, future))
+        return asyncio.wrap_future(future)
+    
+    def post_to_tk(self, func, *args):
+        """Queue func for the Tk thread without waiting for it"""
+        self.tk_queue.put((func, args, None))
+        
+    def show_in_tk(self, results):
+        """Queue added results for display, merged into one update per drain tick"""
+        with self.pending_lock:
+            queued = bool(self.pending_results)
+            self.pending_results.extend(results)
+        if not queued:
+            self.post_to_tk(self._show_pending)
+            
+    def _show_pending(self):
+        with self.pending_lock:
+            results, self.pending_results = self.pending_results, []
+        self.app.show_results(results)
+        self.app.draw_results(results)
+        
+    def publish(self, results):
+        """Stream new results to subscribers, callable from any thread"""
+        if self.subscribers and self.loop:
+            self.loop.call_soon_threadsafe(self._broadcast, results)
+            
+    def _broadcast(self, results):
+        line = self._encode({'jsonrpc': '2.0', 'method': 'result', 'params': {'results': results}})
+        for writer in list(self.subscribers):
+            # Drop subscribers that stopped reading instead of buffering forever
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > self.HIGH_WATER:
+                self.subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+            
+    @staticmethod
+    def _encode(message):
+        return json.dumps(message, separators=(',', ':')).encode() + b"\n"
+    
+    async def handle_client(self, reader, writer):
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.handle_payload(line, writer)
+                if response is not None:
+                    writer.write(self._encode(response))
+                    # Only wait on the socket when the client falls behind
+                    if writer.transport.get_write_buffer_size() > self.HIGH_WATER:
+                        await writer.drain()
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            self.subscribers.discard(writer)
+            writer.close()
+            
+    async def handle_payload(self, line, writer):
+        try:
+            payload = json.loads(line)
+        except ValueError:
+            return self._error(None, -32700, "Parse error")
+        
+        if isinstance(payload, list):
+            if not payload:
+                return self._error(None, -32600, "Invalid Request")
+            responses = [await self.handle_request(request, writer) for request in payload]
+            responses = [response for response in responses if response is not None]
+            return responses or None
+        return await self.handle_request(payload, writer)
+    
+    async def handle_request(self, request, writer):
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return self._error(None, -32600, "Invalid Request")
+        request_id = request.get('id')
+        method = self.methods.get(request['method'])
+        params = request.get('params', [])
+        try:
+            if method is None:
+                response = self._error(request_id, -32601, "Method not found")
+            else:
+                if isinstance(params, dict):
+                    result = method(writer, **params)
+                elif isinstance(params, list):
+                    result = method(writer, *params)
+                else:
+                    raise ValueError("params must be an array or object")
+                if asyncio.iscoroutine(result):
+                    result = await result
+                response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except (TypeError, ValueError, KeyError, IndexError) as e:
+            response = self._error(request_id, -32602, f"Invalid params: {e}")
+        except Exception as e:
+            response = self._error(request_id, -32603, f"Internal error: {e}")
+        
+        # Notifications (no id) get no response, not even an error
+        if 'id' not in request:
+            return None
+        return response
+    
+    @staticmethod
+    def _error(request_id, code, message):
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+    
+    def _measure(self, segments):
+        """Measure [x1, y1, x2, y2] segments at the scale of the monitor they start on"""
+        measurements = []
+        for segment in segments:
+            x1, y1, x2, y2 = coordinates = [float(value) for value in segment]
+            if not all(math.isfinite(value) for value in coordinates):
+                raise ValueError("segment coordinates must be finite numbers")
+            distance = math.hypot(x2 - x1, y2 - y1)
+            real_distance = distance / self.app.scale_at(x1, y1)
+            if not math.isfinite(real_distance):
+                raise ValueError("segment is too long to measure")
+            measurements.append(((x1, y1), (x2, y2), distance, real_distance))
+        return measurements
+    
+    def _monitor(self, monitor):
+        """Monitor by its number N as in "Monitor N", None for the global scale"""
+        if monitor is None:
+            return None
+        number = int(monitor)
+        if not 1 <= number <= len(self.app.monitors):
+            raise ValueError(f"no monitor {monitor}")
+        return self.app.monitors[number - 1]
+    
+    @staticmethod
+    def _load_image(path):
+        image = Image.open(path)
+        image.load()
+        return image, file_source(path)
+    
+    # RPC methods, the first argument is the calling client's writer
+    
+    def rpc_get_scale(self, writer, monitor=None):
+        return self.app.scale_for(self._monitor(monitor))
+    
+    async def rpc_set_scale(self, writer, scale, monitor=None):
+        scale = float(scale)
+        if not (math.isfinite(scale) and scale > 0):
+            raise ValueError("scale must be a positive finite number")
+        monitor = self._monitor(monitor)
+        # Scales change only in Tk, like a scale entered by hand
+        app = self.app
+        await self.call_in_tk(lambda: app.use_scale(scale, app.source, monitor))
+        return scale
+    
+    async def rpc_open_image(self, writer, path):
+        # Decode in a worker thread, only the viewer is built in Tk
+        try:
+            image, source = await self.loop.run_in_executor(None, self._load_image, str(path))
+        except OSError as e:
+            raise ValueError(f"cannot open image: {e}")
+        await self.call_in_tk(self.app.show_image, image, os.path.basename(path), source)
+        return {'width': image.width, 'height': image.height}
+    
+    def rpc_measure(self, writer, segments):
+        return [{'pixel_distance': pixel_distance, 'real_distance': real_distance}
+                for _, _, pixel_distance, real_distance in self._measure(segments)]
+    
+    def rpc_add(self, writer, segments):
+        results = self.app.store_results(self._measure(segments))
+        if results:
+            self.show_in_tk(results)
+        return results
+    
+    def rpc_get_results(self, writer, start=0, count=None):
+        start = int(start)
+        end = None if count is None else start + int(count)
+        with self.app.results_lock:
+            return self.app.results[start:end]
+        
+    async def rpc_clear_results(self, writer):
+        await self.call_in_tk(self.app.clear_results)
+        return True
+    
+    def rpc_subscribe(self, writer):
+        self.subscribers.add(writer)
+        return True
+    
+    def rpc_unsubscribe(self, writer):
+        self.subscribers.discard(writer)
+        return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Visual Drag Measurement Ruler")
+    parser.add_argument("--rpc-socket", metavar="PATH",
+                        help="serve the JSON-RPC automation API on this Unix socket")
+    args = parser.parse_args()
    
     root = tk.Tk()
     app = PersistentVisualRuler(root)
+    
+    server = None
+    if args.rpc_socket:
+        server = MeasurementRPCServer(app, args.rpc_socket)
+        try:
+            server.start()
+        except (OSError, NotImplementedError, AttributeError) as e:
+            server = None
+            messagebox.showerror("Error", f"Cannot start automation API: {e}")
+            
     root.mainloop()
+    
+    if server:
+        server.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,29 @@
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ["pixel ruler EN.py", "pixel ruler CN.py"]
+
+try:
+    import pyautogui  # noqa: F401
+except Exception:
+    # pyautogui needs a display; the code under test never touches the screen
+    sys.modules['pyautogui'] = types.ModuleType('pyautogui')
+
+
+def load_script(filename):
+    name = "pixel_ruler_" + filename.split()[-1].split('.')[0].lower()
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session", params=SCRIPTS)
+def ruler(request):
+    """The EN and CN scripts loaded as modules, both must behave the same"""
+    return load_script(request.param)
@@ -0,0 +1,104 @@
+import types
+
+import numpy as np
+import pytest
+
+WIDTH, HEIGHT = 200, 120
+
+
+def alpha(image):
+    return np.asarray(image)[:, :, 3]
+
+
+def test_ruler_ticks(ruler):
+    # 20 px between major ticks: tenths would be 2 px apart and are skipped,
+    # halves are 10 px long and wholes 16 px; the corner holds both rulers
+    image = alpha(ruler.render_overlay(WIDTH, HEIGHT, 10, 2, "red", True, False))
+    assert list(np.flatnonzero(image[0, 16:]) + 16) == list(range(20, WIDTH, 10))
+    assert list(np.flatnonzero(image[12, 16:]) + 16) == list(range(20, WIDTH, 20))
+    assert list(np.flatnonzero(image[16:, 0]) + 16) == list(range(20, HEIGHT, 10))
+    assert list(np.flatnonzero(image[16:, 12]) + 16) == list(range(20, HEIGHT, 20))
+
+
+def test_crowded_divisions_are_skipped(ruler):
+    # 15 px majors keep 7.5 px halves and drop 1.5 px tenths
+    image = alpha(ruler.render_overlay(WIDTH, HEIGHT, 3, 5, "white", True, False))
+    assert list(np.flatnonzero(image[0, 16:46]) + 16) == [22, 30, 37, 45]
+    assert list(np.flatnonzero(image[12, 16:46]) + 16) == [30, 45]
+    # Majors closer than 4 px draw nothing at all
+    assert not alpha(ruler.render_overlay(WIDTH, HEIGHT, 3, 1, "white", True, True)).any()
+
+
+def test_grid_lines(ruler):
+    image = ruler.render_overlay(WIDTH, HEIGHT, 10, 2, "blue", False, True)
+    pixels = np.asarray(image)
+    assert list(np.flatnonzero(pixels[50, :, 3])) == list(range(0, WIDTH, 20))
+    assert list(np.flatnonzero(pixels[:, 30, 3])) == list(range(0, HEIGHT, 20))
+    assert tuple(pixels[0, 0]) == (0, 0, 255, 255)
+
+
+@pytest.fixture
+def overlay_app(ruler, monkeypatch):
+    """Enough of the app for overlay_image, PhotoImage needs a display so images pass through"""
+    renders = []
+
+    def render_overlay(*args):
+        renders.append(args)
+        return args
+
+    monkeypatch.setattr(ruler, 'render_overlay', render_overlay)
+    monkeypatch.setattr(ruler, 'ImageTk', types.SimpleNamespace(PhotoImage=lambda image: [image]))
+    app = types.SimpleNamespace(
+        scale_factor=100.0, monitor_scales={}, grid_spacing=1.0, grid_color="white",
+        overlay_cache={}, renders=renders,
+        rulers_var=types.SimpleNamespace(get=lambda: True),
+        grid_var=types.SimpleNamespace(get=lambda: False))
+    app.scale_for = lambda monitor: ruler.PersistentVisualRuler.scale_for(app, monitor)
+    app.overlay_image = lambda monitor: ruler.PersistentVisualRuler.overlay_image(app, monitor)
+    return app
+
+
+MONITOR = {'name': "Monitor 1", 'x': 0, 'y': 0, 'width': 1920, 'height': 1080}
+
+
+def test_overlay_rendered_once_per_key(overlay_app):
+    first = overlay_app.overlay_image(MONITOR)
+    assert overlay_app.overlay_image(MONITOR) is first
+    assert len(overlay_app.renders) == 1
+    assert overlay_app.renders[0] == (1920, 1080, 100.0, 1.0, "white", True, False)
+
+    overlay_app.grid_spacing = 2.0
+    overlay_app.overlay_image(MONITOR)
+    assert len(overlay_app.renders) == 2
+    overlay_app.grid_spacing = 1.0
+    assert overlay_app.overlay_image(MONITOR) is first
+    assert len(overlay_app.renders) == 2
+
+    overlay_app.monitor_scales["Monitor 1"] = 50.0
+    overlay_app.overlay_image(MONITOR)
+    assert overlay_app.renders[-1][2] == 50.0
+    assert len(overlay_app.renders) == 3
+
+
+def test_non_finite_grid_spacing_is_rejected(ruler):
+    class Entry:
+        def __init__(self, text):
+            self.text = text
+
+        def get(self):
+            return self.text
+
+        def delete(self, first, last):
+            self.text = ""
+
+        def insert(self, index, text):
+            self.text = text
+
+    for text in ["nan", "inf", "0", "-1", "abc"]:
+        refreshed = []
+        app = types.SimpleNamespace(grid_spacing=1.0, spacing_entry=Entry(text),
+                                    refresh_overlays=lambda: refreshed.append(True))
+        ruler.PersistentVisualRuler.change_grid(app)
+        assert app.grid_spacing == 1.0
+        assert app.spacing_entry.text == "1"
+        assert not refreshed
@@ -0,0 +1,205 @@
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="needs Unix sockets")
+
+
+@pytest.fixture
+def server(ruler, tmp_path):
+    """The real server on a headless app; Tk work is drained by a plain thread"""
+    ruler_class = ruler.PersistentVisualRuler
+
+    class Root:
+        def after(self, ms, func, *args):
+            pass
+
+    class App:
+        store_results = ruler_class.store_results
+        use_scale = ruler_class.use_scale
+        scale_for = ruler_class.scale_for
+        scale_at = ruler_class.scale_at
+        monitor_at = ruler_class.monitor_at
+
+        def __init__(self):
+            self.root = Root()
+            self.scale_factor = 100.0
+            self.monitor_scales = {}
+            self.monitors = [{'name': "Monitor 1", 'x': 0, 'y': 0, 'width': 1000, 'height': 1000},
+                             {'name': "Monitor 2", 'x': 1000, 'y': 0, 'width': 1000, 'height': 1000}]
+            self.source = None
+            self.results = []
+            self.results_lock = threading.Lock()
+            self.rpc_server = None
+            self.shown = []
+
+        def update_scale_entry(self):
+            pass
+
+        def remember_scale(self, source, monitor=None):
+            pass
+
+        def refresh_overlays(self):
+            pass
+
+        def show_results(self, results):
+            self.shown.append(len(results))
+
+        def draw_results(self, results):
+            pass
+
+        def clear_results(self):
+            with self.results_lock:
+                self.results = []
+
+    server = ruler.MeasurementRPCServer(App(), str(tmp_path / "rpc.sock"))
+    server.start()
+    stop = threading.Event()
+
+    def pump():
+        while not stop.is_set():
+            server._drain_tk_queue()
+            time.sleep(0.005)
+
+    threading.Thread(target=pump, daemon=True).start()
+    yield server
+    stop.set()
+    server.stop()
+
+
+class Client:
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX)
+        self.sock.settimeout(5)
+        self.sock.connect(path)
+        self.file = self.sock.makefile('rwb')
+
+    def send(self, payload):
+        line = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.file.write(line + b"\n")
+        self.file.flush()
+
+    def receive(self):
+        return json.loads(self.file.readline())
+
+    def call(self, payload):
+        self.send(payload)
+        return self.receive()
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+@pytest.fixture
+def client(server):
+    client = Client(server.path)
+    yield client
+    client.close()
+
+
+def request(request_id, method, *params):
+    return {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': list(params)}
+
+
+def error_code(response):
+    return response['error']['code']
+
+
+def test_measure_uses_monitor_scale(client):
+    assert client.call(request(1, 'set_scale', 50))['result'] == 50
+    assert client.call(request(2, 'set_scale', 200, 2))['result'] == 200
+    assert client.call(request(3, 'get_scale'))['result'] == 50
+    assert client.call(request(4, 'get_scale', 2))['result'] == 200
+    results = client.call(request(5, 'measure', [[0, 0, 300, 400], [1000, 0, 1300, 400]]))['result']
+    assert [r['real_distance'] for r in results] == [10, 2.5]
+
+
+def test_batch(client):
+    responses = client.call([
+        request(1, 'get_scale'),
+        request(2, 'no_such_method'),
+        {'jsonrpc': '2.0', 'method': 'get_scale'},
+        request(3, 'measure', [[0, 0, 3, 4]]),
+    ])
+    assert [r['id'] for r in responses] == [1, 2, 3]
+    assert responses[0]['result'] == 100
+    assert error_code(responses[1]) == -32601
+    assert responses[2]['result'] == [{'pixel_distance': 5, 'real_distance': 0.05}]
+
+
+def test_notifications_get_no_response(client):
+    client.send({'jsonrpc': '2.0', 'method': 'no_such_method'})
+    client.send({'jsonrpc': '2.0', 'method': 'set_scale', 'params': ["inf"]})
+    client.send([{'jsonrpc': '2.0', 'method': 'get_scale'}])
+    assert client.call(request(7, 'get_scale')) == {'jsonrpc': '2.0', 'id': 7, 'result': 100}
+
+
+def test_add_streams_to_subscribers(server, client):
+    subscriber = Client(server.path)
+    try:
+        assert subscriber.call(request(1, 'subscribe'))['result'] is True
+        added = client.call(request(2, 'add', [[0, 0, 30, 40], [0, 0, 60, 80]]))['result']
+        assert [r['index'] for r in added] == [0, 1]
+        notification = subscriber.receive()
+        assert notification['method'] == 'result'
+        assert notification['params']['results'] == added
+        assert client.call(request(3, 'get_results', 1))['result'] == added[1:]
+    finally:
+        subscriber.close()
+
+
+def test_added_results_are_shown_in_few_updates(server, client):
+    for i in range(100):
+        client.send(request(i, 'add', [[0, 0, 1, 1]]))
+    for i in range(100):
+        client.receive()
+    deadline = time.time() + 5
+    while sum(server.app.shown) < 100 and time.time() < deadline:
+        time.sleep(0.01)
+    assert sum(server.app.shown) == 100
+    assert len(server.app.shown) < 100
+
+
+@pytest.mark.parametrize("payload, code", [
+    (b'{"jsonrpc": "2.0", "id": 1, "method"', -32700),
+    (b'[]', -32600),
+    (b'{"jsonrpc": "2.0", "id": 1}', -32600),
+    (request(1, 'no_such_method'), -32601),
+    (request(1, 'set_scale', "inf"), -32602),
+    (request(1, 'set_scale', 0), -32602),
+    (request(1, 'set_scale', 10, 3), -32602),
+    (request(1, 'measure', [[0, 0, "nan", 1]]), -32602),
+    (request(1, 'measure', [[-1e308, 0, 1e308, 0]]), -32602),
+    (request(1, 'measure', [[0, 0, 1]]), -32602),
+    (request(1, 'get_scale', 1, 2, 3), -32602),
+])
+def test_error_codes(client, payload, code):
+    assert error_code(client.call(payload)) == code
+
+
+def test_refuses_to_replace_other_files(ruler, tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("keep me")
+    with pytest.raises(OSError):
+        ruler.MeasurementRPCServer(None, str(path))._remove_stale_socket()
+    assert path.read_text() == "keep me"
+
+
+def test_refuses_to_take_over_a_live_socket(ruler, server):
+    with pytest.raises(OSError):
+        ruler.MeasurementRPCServer(None, server.path)._remove_stale_socket()
+    assert os.path.exists(server.path)
+
+
+def test_removes_stale_socket(ruler, tmp_path):
+    path = str(tmp_path / "stale.sock")
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+    ruler.MeasurementRPCServer(None, path)._remove_stale_socket()
+    assert not os.path.exists(path)
@@ -0,0 +1,47 @@
+import numpy as np
+from PIL import Image
+
+WIDTH, HEIGHT = 600, 400
+
+
+def page(*boxes):
+    """White page with black (x, y, width, height) boxes"""
+    pixels = np.full((HEIGHT, WIDTH), 255, dtype=np.uint8)
+    for x, y, width, height in boxes:
+        pixels[y:y + height, x:x + width] = 0
+    return Image.fromarray(pixels).convert('RGB')
+
+
+BAR = (350, 300, 200, 6)
+
+
+def test_finds_bar(ruler):
+    assert ruler.detect_scale_bar(page(BAR)) == BAR
+
+
+def test_no_bar(ruler):
+    assert ruler.detect_scale_bar(page()) is None
+    assert ruler.detect_scale_bar(page((10, 50, 500, 1), (10, 90, 500, 2))) is None
+
+
+def test_hairline_rules_lose_to_bar(ruler):
+    assert ruler.detect_scale_bar(page((10, 100, 580, 2), (10, 200, 580, 1), BAR)) == BAR
+
+
+def test_bands_spanning_the_frame_are_ignored(ruler):
+    taskbar = (0, HEIGHT - 40, WIDTH, 40)
+    toolbar = (0, 0, WIDTH, 6)
+    assert ruler.detect_scale_bar(page(taskbar, toolbar, BAR)) == BAR
+    assert ruler.detect_scale_bar(page(taskbar, toolbar)) is None
+
+
+def test_too_thick_is_not_a_bar(ruler):
+    assert ruler.detect_scale_bar(page((20, 20, 500, 30), BAR)) == BAR
+
+
+def test_isolated_bar_is_preferred(ruler):
+    # A longer bar sitting on top of a dark box is the box's edge, not a scale bar
+    edge = (20, 40, 400, 4)
+    box = (30, 44, 380, 100)
+    assert ruler.detect_scale_bar(page(edge, box, BAR)) == BAR
+    assert ruler.detect_scale_bar(page(edge, box)) == edge
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+WIDTH, HEIGHT, VIEW = 400, 3000, 500
+
+
+def line_drawing():
+    """White page with 2 px lines, the kind of content that changes in row pairs"""
+    rng = np.random.default_rng(1)
+    page = np.full((HEIGHT, WIDTH, 3), 255, dtype=np.uint8)
+    for y in rng.choice(HEIGHT // 2, 300, replace=False) * 2:
+        x = int(rng.integers(0, WIDTH - 50))
+        page[y:y + 2, x:x + int(rng.integers(20, WIDTH - x))] = 0
+    for x in rng.choice(WIDTH // 2, 20, replace=False) * 2:
+        y = int(rng.integers(0, HEIGHT - 200))
+        page[y:y + int(rng.integers(50, 200)), x:x + 2] = 0
+    return Image.fromarray(page)
+
+
+def block_pattern():
+    """Random 10 px blocks, every row repeats ten times"""
+    rng = np.random.default_rng(2)
+    blocks = rng.integers(0, 256, (HEIGHT // 10, WIDTH // 10), dtype=np.uint8)
+    return Image.fromarray(np.kron(blocks, np.ones((10, 10), dtype=np.uint8))).convert('RGB')
+
+
+def stitch(ruler, document, offsets):
+    capture = ruler.ScrollCapture(bbox=(0, 0, WIDTH, VIEW))
+    for offset in offsets:
+        capture.add_frame(document.crop((0, offset, WIDTH, offset + VIEW)))
+    return capture.stitched_image()
+
+
+def scroll_offsets(step):
+    offsets = list(range(0, HEIGHT - VIEW, step))
+    return offsets + [HEIGHT - VIEW]
+
+
+@pytest.mark.parametrize("document", [line_drawing, block_pattern])
+@pytest.mark.parametrize("step", [17, 37, 60])
+def test_stitched_image_matches_document(ruler, document, step):
+    source = document()
+    stitched = stitch(ruler, source, scroll_offsets(step))
+    assert stitched.size == source.size
+    assert np.array_equal(np.asarray(stitched), np.asarray(source))
+
+
+def test_scrolling_back_up(ruler):
+    source = line_drawing()
+    offsets = scroll_offsets(40)
+    middle = offsets[len(offsets) // 2]
+    # Start in the middle, scroll to the top, then down to the end
+    offsets = list(range(middle, 0, -40)) + [0] + [o for o in offsets if o > 0]
+    stitched = stitch(ruler, source, offsets)
+    assert np.array_equal(np.asarray(stitched), np.asarray(source))
+
+
+def test_idle_frames_are_skipped(ruler):
+    source = block_pattern()
+    capture = ruler.ScrollCapture(bbox=(0, 0, WIDTH, VIEW))
+    frame = source.crop((0, 0, WIDTH, VIEW))
+    capture.add_frame(frame)
+    assert not capture.add_frame(frame)
+    assert capture.stitched_image() is None
+
+
+def test_static_toolbars_are_left_out(ruler):
+    source = line_drawing()
+    rng = np.random.default_rng(3)
+    header = Image.fromarray(rng.integers(0, 256, (30, WIDTH, 3), dtype=np.uint8))
+    footer = Image.fromarray(rng.integers(0, 256, (20, WIDTH, 3), dtype=np.uint8))
+    capture = ruler.ScrollCapture(bbox=(0, 0, WIDTH, VIEW))
+    for offset in scroll_offsets(37):
+        frame = source.crop((0, offset, WIDTH, offset + VIEW))
+        frame.paste(header, (0, 0))
+        frame.paste(footer, (0, VIEW - 20))
+        capture.add_frame(frame)
+    expected = source.crop((0, 30, WIDTH, HEIGHT - 20))
+    assert np.array_equal(np.asarray(capture.stitched_image()), np.asarray(expected))
+
+
+@pytest.mark.parametrize("document", [line_drawing, block_pattern])
+def test_fast_flick_within_overlap(ruler, document):
+    # A 300 row jump leaves 200 rows of overlap, more than half the frame
+    source = document()
+    offsets = [0, 20, 40, 60] + list(range(360, HEIGHT - VIEW + 1, 20))
+    stitched = stitch(ruler, source, offsets)
+    assert np.array_equal(np.asarray(stitched), np.asarray(source))
+
+
+def test_registration_recovers_after_scrolling_back(ruler):
+    source = block_pattern()
+    capture = ruler.ScrollCapture(bbox=(0, 0, WIDTH, VIEW))
+
+    def show(offset):
+        return capture.add_frame(source.crop((0, offset, WIDTH, offset + VIEW)))
+
+    for offset in [0, 20, 40, 60]:
+        show(offset)
+    # Jumping past the last stitched frame cannot be registered
+    for offset in [700, 720, 740]:
+        assert not show(offset)
+    assert capture.lost
+    # Scrolling back to overlap it picks the capture up again
+    for offset in range(440, HEIGHT - VIEW + 1, 20):
+        assert show(offset)
+    assert not capture.lost
+    assert np.array_equal(np.asarray(capture.stitched_image()), np.asarray(source))